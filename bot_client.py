@@ -2,20 +2,95 @@
 
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, simpledialog
+import os
+import errno
+import selectors
 import socket
 import json
+import struct
 import threading
+import collections
 import sys
 
 # Default Configuration
 DEFAULT_SERVER_IP = "127.0.0.1"  # localhost for testing
 SERVER_PORT = 9999
-BUFFER_SIZE = 16384
+BUFFER_SIZE = 65536  # Per-recv read size; page-aligned and below the 128 KB malloc mmap threshold
+UNIX_SOCKET_PATH = "/tmp/rag.sock"  # Used when the server runs on this machine
+MAX_HISTORY_LINES = 5000  # Older chat lines are trimmed to keep redraws cheap
+
+# connect_ex() results meaning "still connecting" on a non-blocking socket
+_CONNECT_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN,
+                        getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK)}
+
+# Frame header: 4-byte big-endian payload length (format parsed once)
+_HDR = struct.Struct('>I')
+
+# Fast C-extension JSON codec when available (bytes in / bytes out)
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+    def _json_loads(data):
+        return json.loads(bytes(data))
+
+
+def _recv_exact_into(sock, view):
+    """Fill the whole memoryview from the socket (False if the peer closed early)"""
+    while len(view):
+        n = sock.recv_into(view, min(len(view), BUFFER_SIZE))
+        if not n:
+            return False
+        view = view[n:]
+    return True
+
+def send_msg(sock, obj):
+    """Send a JSON message prefixed with its 4-byte big-endian length"""
+    data = _json_dumps(obj)
+    header = _HDR.pack(len(data))
+    if not hasattr(sock, 'sendmsg'):  # Windows
+        sock.sendall(header + data)
+        return
+    # Scatter-gather: header and body leave in one syscall without concatenation
+    sent = sock.sendmsg((header, data))
+    if sent < len(header):
+        sock.sendall(memoryview(header)[sent:])
+    if sent < len(header) + len(data):
+        sock.sendall(memoryview(data)[max(0, sent - len(header)):])
+
+def recv_msg(sock, buf):
+    """
+    Receive one length-prefixed JSON message (None on disconnect).
+    Reads straight into the caller's reusable bytearray; only messages larger
+    than that buffer get a one-off allocation.
+    """
+    view = memoryview(buf)
+    if not _recv_exact_into(sock, view[:_HDR.size]):
+        return None
+    (length,) = _HDR.unpack_from(buf)
+    if length > len(buf):
+        view = memoryview(bytearray(length))
+    body = view[:length]
+    if not _recv_exact_into(sock, body):
+        return None
+    return _json_loads(body)
 
 class TCPClientGUI:
     def __init__(self, master):
         self.master = master
         
+        # Persistent connection to the server (reused across queries)
+        self._conn_lock = threading.Lock()
+        self._sock = None
+        self._recv_buf = bytearray(BUFFER_SIZE)  # Reused for every reply
+        
+        # Pending chat appends, flushed together on the next idle cycle
+        self._pending = collections.deque()
+        self._flush_scheduled = False
+        
         # Ask user for server IP on startup
         self.server_ip = simpledialog.askstring(
             "Server Connection",
@@ -32,6 +107,15 @@ class TCPClientGUI:
             master.destroy()
             return
         
+        # Resolve the server address once instead of on every connect
+        self._family, self._sockaddr = socket.AF_INET, (self.server_ip, SERVER_PORT)
+        try:
+            infos = socket.getaddrinfo(self.server_ip, SERVER_PORT,
+                                       socket.AF_INET, socket.SOCK_STREAM)
+            self._family, _, _, _, self._sockaddr = infos[0]
+        except socket.gaierror:
+            pass  # Unresolvable now; connect() will surface the error
+        
         master.title(f"RAG Chatbot Client - {self.server_ip}:{SERVER_PORT}")
         master.geometry("1000x700")
         
@@ -146,42 +230,71 @@ class TCPClientGUI:
         threading.Thread(target=self._ping_server, daemon=True).start()
 
     def _ping_server(self):
+        sock = socket.socket(self._family, socket.SOCK_STREAM)
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(3)
-            result = sock.connect_ex((self.server_ip, SERVER_PORT))
-            sock.close()
-            
-            if result == 0:
-                self.master.after(0, lambda: self.status_lbl.config(
-                    text=f"✅ Connected to {self.server_ip}:{SERVER_PORT}", 
-                    fg="#66BB6A"
-                ))
-                self.master.after(0, lambda: self._append_text(
-                    "✓ Successfully connected to server! You can start asking questions.",
-                    'system'
-                ))
-            else:
-                self.master.after(0, lambda: self.status_lbl.config(
-                    text=f"❌ Server Unreachable ({self.server_ip}:{SERVER_PORT})", 
-                    fg="#EF5350"
-                ))
-                self.master.after(0, lambda: self._append_text(
-                    "✗ Cannot connect to server. Please check:\n"
-                    "  1. Server is running (bot_server.py)\n"
-                    "  2. IP address is correct\n"
-                    "  3. Firewall allows port 9999",
-                    'system'
-                ))
+            # Non-blocking connect: a refused connection (RST) is reported as
+            # soon as it arrives instead of after a blocking timeout
+            sock.setblocking(False)
+            err = sock.connect_ex(self._sockaddr)
+            if err in _CONNECT_IN_PROGRESS:
+                with selectors.DefaultSelector() as sel:
+                    sel.register(sock, selectors.EVENT_WRITE)
+                    if sel.select(timeout=3.0):
+                        err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    else:
+                        err = errno.ETIMEDOUT
+            self.master.after(0, self._on_ping_result, err == 0)
         except Exception as e:
-            self.master.after(0, lambda: self._append_text(
-                f"Connection error: {e}",
+            self.master.after(0, self._append_text, f"Connection error: {e}", 'system')
+        finally:
+            sock.close()
+
+    def _on_ping_result(self, reachable):
+        """Apply the connection check result in one Tk callback"""
+        if reachable:
+            self.status_lbl.config(
+                text=f"✅ Connected to {self.server_ip}:{SERVER_PORT}", 
+                fg="#66BB6A"
+            )
+            self._append_text(
+                "✓ Successfully connected to server! You can start asking questions.",
+                'system'
+            )
+        else:
+            self.status_lbl.config(
+                text=f"❌ Server Unreachable ({self.server_ip}:{SERVER_PORT})", 
+                fg="#EF5350"
+            )
+            self._append_text(
+                "✗ Cannot connect to server. Please check:\n"
+                "  1. Server is running (bot_server.py)\n"
+                "  2. IP address is correct\n"
+                "  3. Firewall allows port 9999",
                 'system'
-            ))
+            )
 
     def _append_text(self, text, tag):
+        self._pending.append((text, tag))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.master.after_idle(self._flush_pending)
+
+    def _flush_pending(self):
+        """Insert all queued messages with a single layout/scroll pass"""
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        
         self.chat_history.config(state='normal')
-        self.chat_history.insert(tk.END, f"\n{text}\n", tag)
+        while self._pending:
+            text, tag = self._pending.popleft()
+            self.chat_history.insert(tk.END, f"\n{text}\n", tag)
+        
+        # Trim old history so relayout stays proportional to the viewport
+        line_count = int(self.chat_history.index('end-1c').split('.')[0])
+        if line_count > MAX_HISTORY_LINES:
+            self.chat_history.delete('1.0', f"{line_count - MAX_HISTORY_LINES}.0")
+        
         self.chat_history.config(state='disabled')
         self.chat_history.see(tk.END)
 
@@ -198,72 +311,95 @@ class TCPClientGUI:
         
         threading.Thread(target=self._send_tcp_packet, args=(q,), daemon=True).start()
 
+    def _connect_local(self):
+        """Connect over the server's Unix domain socket when on the same machine"""
+        if (self.server_ip not in ('127.0.0.1', 'localhost')
+                or not hasattr(socket, 'AF_UNIX')
+                or not os.path.exists(UNIX_SOCKET_PATH)):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(120)
+        try:
+            sock.connect(UNIX_SOCKET_PATH)
+        except OSError:
+            sock.close()
+            return None  # Stale socket file; fall back to TCP
+        return sock
+
+    def _get_conn(self):
+        """Return the persistent server connection, connecting lazily"""
+        if self._sock is None:
+            self._sock = self._connect_local()
+        if self._sock is None:
+            sock = socket.socket(self._family, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(120)
+            try:
+                sock.connect(self._sockaddr)
+            except Exception:
+                sock.close()
+                raise
+            self._sock = sock
+        return self._sock
+
+    def _close_conn(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _exchange(self, request):
+        """Send one request over the persistent connection and return the reply"""
+        with self._conn_lock:
+            # A stale keep-alive connection is retried once on a fresh socket
+            for attempt in range(2):
+                sock = self._get_conn()
+                try:
+                    send_msg(sock, request)
+                    resp = recv_msg(sock, self._recv_buf)
+                    if resp is None:
+                        raise ConnectionResetError("Server closed the connection")
+                    return resp
+                except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+                    self._close_conn()
+                    if attempt:
+                        raise
+                except Exception:
+                    self._close_conn()
+                    raise
+
     def _send_tcp_packet(self, question):
+        err, ans, elapsed = None, None, None
         try:
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.settimeout(120)
-            client_socket.connect((self.server_ip, SERVER_PORT))
-            
-            # Send request
-            client_socket.sendall(json.dumps({"question": question}).encode('utf-8'))
-            
-            # Receive response
-            data = client_socket.recv(BUFFER_SIZE)
-            resp = json.loads(data.decode('utf-8'))
-            
-            client_socket.close()
+            # Send request and receive response
+            resp = self._exchange({"question": question})
             
             # Process response
             if resp.get("status") == "success":
                 ans = resp.get("answer", "")
-                time_taken = resp.get("time", 0)
-                
-                self.master.after(0, lambda: self._append_text(
-                    f"Bot: {ans}\n⏱️ Response time: {time_taken}s",
-                    'bot'
-                ))
+                elapsed = resp.get("time", 0)
             else:
-                error_msg = resp.get("answer", "Unknown error")
-                self.master.after(0, lambda: self._append_text(
-                    f"Error: {error_msg}",
-                    'system'
-                ))
-            
-            # Re-enable send button
-            self.master.after(0, lambda: self.send_btn.config(
-                state='normal', 
-                text="Send ➤"
-            ))
+                err = resp.get("answer", "Unknown error")
             
         except socket.timeout:
-            self.master.after(0, lambda: self._append_text(
-                "Error: Request timed out. The server might be processing a complex query.",
-                'system'
-            ))
-            self.master.after(0, lambda: self.send_btn.config(
-                state='normal', 
-                text="Send ➤"
-            ))
-            
+            err = "Request timed out. The server might be processing a complex query."
         except ConnectionRefusedError:
-            self.master.after(0, lambda: self._append_text(
-                "Error: Connection refused. Please ensure the server is running.",
-                'system'
-            ))
-            self.master.after(0, lambda: self.send_btn.config(
-                state='normal', 
-                text="Send ➤"
-            ))
-            
+            err = "Connection refused. Please ensure the server is running."
         except Exception as e:
-            self.master.after(0, lambda: self._append_text(
-                f"Error: {e}",
-                'system'
-            ))
-            self.master.after(0, lambda: self.send_btn.config(
-                state='normal', 
-                text="Send ➤"
-            ))
+            err = str(e)
+        finally:
+            # One Tk callback shows the outcome and re-enables the send button
+            self.master.after(0, self._finalize, err, ans, elapsed)
+
+    def _finalize(self, err, ans, elapsed):
+        if err is None:
+            self._append_text(f"Bot: {ans}\n⏱️ Response time: {elapsed}s", 'bot')
+        else:
+            self._append_text(f"Error: {err}", 'system')
+        self.send_btn.config(state='normal', text="Send ➤")
 
     def _clear_chat(self):
         self.chat_history.config(state='normal')
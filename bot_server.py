@@ -1,27 +1,64 @@
 # bot_server.py
 
+import asyncio
 import socket
-import threading
 import json
+import struct
 import time
 import os
 import sys
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # Add src to path
 sys.path.append(os.getcwd())
 
-from src.config import VECTOR_INDEX_NAME, RETRIEVAL_K, SERVER_PORT, BUFFER_SIZE
+from src.config import (
+    VECTOR_INDEX_NAME,
+    RETRIEVAL_K,
+    SERVER_PORT,
+    SERVER_MAX_WORKERS,
+    SERVER_MAX_PENDING,
+    BATCH_WINDOW_MS,
+    MAX_BATCH_SIZE,
+    UNIX_SOCKET_PATH,
+    SOCKET_BUFFER_BYTES,
+    MAX_REQUEST_BYTES,
+    MAX_QUESTION_CHARS
+)
 from src.model_loader import load_llm, preload_models, cleanup_models
 from src.vector_store import load_vector_store
-from src.chatbot import create_chatbot, ask_question
+from src.chatbot import create_chatbot, ask_questions, get_cached_answer
 
 # Configuration
 SERVER_IP = "0.0.0.0"  # Listen on all network interfaces
+# Large accept backlog so bursts of clients are not refused
+LISTEN_BACKLOG = min(128, socket.SOMAXCONN)
+
+# Frame header: 4-byte big-endian payload length (format parsed once)
+_HDR = struct.Struct('>I')
+
+# Fast C-extension JSON codec when available (bytes in / bytes out)
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
 
 # Global RAG variables
 rag_chain = None
 is_ready = False
 
+# Bounded pool for the blocking RAG calls; only touched from the event loop
+_rag_pool = ThreadPoolExecutor(max_workers=SERVER_MAX_WORKERS, thread_name_prefix='rag')
+_pending_requests = 0
+_scheduler = None
+_in_flight = {}  # normalized question -> asyncio future of the answer being generated
+
 def get_local_ip():
     """Get the local IP address of this machine"""
     try:
@@ -33,68 +70,218 @@ def get_local_ip():
     except:
         return "localhost"
 
-def handle_client(client_socket, client_address):
+class BatchScheduler:
     """
-    Handles a single client connection in a separate thread
+    Coalesces questions that arrive within a short window into one batched
+    chain call so concurrent clients share the LLM prefill cost.
     """
-    global rag_chain, is_ready
     
-    print(f"🔗 Connection from {client_address}")
+    def __init__(self, pool, window=BATCH_WINDOW_MS / 1000, max_batch=MAX_BATCH_SIZE):
+        self._pool = pool
+        self._window = window
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        threading.Thread(target=self._collect, name='rag-batcher', daemon=True).start()
+    
+    def submit(self, question):
+        """Queue a question; the returned Future resolves to its answer"""
+        future = Future()
+        self._queue.put((question, future))
+        return future
     
+    def _collect(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self._window
+            while len(items) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._pool.submit(self._run_batch, items)
+    
+    @staticmethod
+    def _run_batch(items):
+        try:
+            answers = ask_questions(rag_chain, [question for question, _ in items])
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), answer in zip(items, answers):
+            future.set_result(answer)
+
+def _frame(obj):
+    """
+    Encode a JSON message as a (length header, body) pair for writer.writelines.
+    Python 3.12+ transports send the pair with sendmsg (no header + body copy);
+    older ones still join the buffers internally.
+    """
+    data = _json_dumps(obj)
+    return _HDR.pack(len(data)), data
+
+# Fixed replies are encoded and framed once at import; the non-LLM paths
+# then cost a single write with no JSON encoding
+_EMPTY_QUESTION_FRAME = _frame({"status": "error", "answer": "Empty question received."})
+_NOT_READY_FRAME = _frame({"status": "error", "answer": "System is still loading models. Please wait."})
+_BUSY_FRAME = _frame({"status": "busy", "answer": "Server is busy. Please try again shortly."})
+_BAD_JSON_FRAME = _frame({"status": "error", "answer": "Malformed request."})
+_TOO_LARGE_FRAME = _frame({"status": "error", "answer": "Request too large."})
+
+async def _process_request(request_json):
+    """
+    Build the framed response for one request; the blocking RAG call runs in the bounded pool
+    """
+    global _pending_requests
+    
+    question = request_json.get("question", "") if isinstance(request_json, dict) else ""
+    question = question.strip()[:MAX_QUESTION_CHARS] if isinstance(question, str) else ""
+
+    if not question:
+        return _EMPTY_QUESTION_FRAME
+    if not is_ready:
+        return _NOT_READY_FRAME
+    
+    # Repeated questions are answered straight from the cache, skipping the
+    # batching window and the worker pool entirely
+    cached = get_cached_answer(question)
+    if cached is not None:
+        print(f"⚡ Cache hit: {question}")
+        return _frame({"status": "success", "answer": cached, "time": 0.0})
+    
+    # A question already being answered (from any client) waits on that
+    # answer instead of queueing a second LLM call
+    in_flight_key = question.lower()
+    answer_future = _in_flight.get(in_flight_key)
+    if answer_future is None:
+        if _pending_requests >= SERVER_MAX_PENDING:
+            # Fail fast instead of letting the client sit until its timeout
+            return _BUSY_FRAME
+        # Ask the RAG Chatbot (batched with any concurrent questions)
+        answer_future = asyncio.wrap_future(_scheduler.submit(question))
+        _pending_requests += 1
+        _in_flight[in_flight_key] = answer_future
+        answer_future.add_done_callback(lambda _: _release_in_flight(in_flight_key))
+
+    print(f"📩 Query: {question}")
+    start_time = time.time()
     try:
-        # 1. Receive Request
-        request_data = client_socket.recv(BUFFER_SIZE).decode('utf-8')
+        # Shielded so one client disconnecting does not cancel the others' answer
+        answer_text = await asyncio.shield(answer_future)
+        elapsed = round(time.time() - start_time, 2)
         
-        if not request_data:
-            return
+        print(f"✓ Answered in {elapsed}s")
+        return _frame({
+            "status": "success",
+            "answer": answer_text,
+            "time": elapsed
+        })
+        
+    except Exception as e:
+        print(f"✗ Processing Error: {e}")
+        return _frame({"status": "error", "answer": f"Internal Error: {str(e)}"})
 
-        try:
-            request_json = json.loads(request_data)
-            question = request_json.get("question", "")
-        except json.JSONDecodeError:
-            question = ""
-
-        response = {}
-
-        # 2. Process Logic
-        if not question:
-            response = {"status": "error", "answer": "Empty question received."}
-        elif not is_ready:
-            response = {"status": "error", "answer": "System is still loading models. Please wait."}
-        else:
-            print(f"📩 Query: {question}")
-            start_time = time.time()
+def _release_in_flight(key):
+    """Forget a finished question so the next ask starts a fresh LLM call"""
+    global _pending_requests
+    _pending_requests -= 1
+    _in_flight.pop(key, None)
+
+def _tune_client_socket(sock):
+    """Disable Nagle and enable keep-alive on an accepted client socket"""
+    if sock is None:
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # Linux only: ACK immediately instead of waiting for delayed-ACK
+        quickack = getattr(socket, 'TCP_QUICKACK', None)
+        if quickack is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, quickack, 1)
+    except OSError:
+        pass
+
+async def handle_client(reader, writer):
+    """
+    Handles a single client connection as a coroutine on the event loop
+    """
+    client_address = writer.get_extra_info('peername')
+    print(f"🔗 Connection from {client_address}")
+    _tune_client_socket(writer.get_extra_info('socket'))
+    
+    try:
+        # Serve requests until the client closes the persistent connection
+        while True:
+            # 1. Receive Request
             try:
-                # Ask the RAG Chatbot
-                answer_text = ask_question(rag_chain, question)
-                elapsed = round(time.time() - start_time, 2)
-                
-                response = {
-                    "status": "success",
-                    "answer": answer_text,
-                    "time": elapsed
-                }
-                print(f"✓ Answered in {elapsed}s")
-                
-            except Exception as e:
-                print(f"✗ Processing Error: {e}")
-                response = {"status": "error", "answer": f"Internal Error: {str(e)}"}
+                header = await reader.readexactly(_HDR.size)
+                (length,) = _HDR.unpack(header)
+                if length > MAX_REQUEST_BYTES:
+                    # Refuse without reading the body; the stream cannot be resynced
+                    writer.writelines(_TOO_LARGE_FRAME)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length)
+            except asyncio.IncompleteReadError:
+                break
 
-        # 3. Send Response
-        response_data = json.dumps(response).encode('utf-8')
-        client_socket.sendall(response_data)
+            # 2. Process Logic (malformed requests never reach the RAG chain)
+            try:
+                request_json = _json_loads(body)
+            except ValueError:
+                response_frame = _BAD_JSON_FRAME
+            else:
+                response_frame = await _process_request(request_json)
+
+            # 3. Send Response
+            writer.writelines(response_frame)
+            await writer.drain()
 
     except Exception as e:
         print(f"✗ Connection Error: {e}")
     finally:
         # 4. Clean up
-        client_socket.close()
+        print(f"🔌 Disconnected {client_address}")
+        writer.close()
+
+async def _serve(server_sock):
+    """Run the asyncio TCP front end on an already-bound listening socket"""
+    server = await asyncio.start_server(
+        handle_client, sock=server_sock, backlog=LISTEN_BACKLOG
+    )
+    
+    # Same-machine clients can skip the TCP/IP stack via a Unix domain socket
+    unix_server = None
+    if hasattr(socket, 'AF_UNIX') and sys.platform != 'win32':
+        try:
+            if os.path.exists(UNIX_SOCKET_PATH):
+                os.unlink(UNIX_SOCKET_PATH)
+            unix_server = await asyncio.start_unix_server(
+                handle_client, path=UNIX_SOCKET_PATH, backlog=LISTEN_BACKLOG
+            )
+            print(f"🎧 Listening for local connections on {UNIX_SOCKET_PATH}")
+        except OSError as e:
+            print(f"⚠️ Unix socket unavailable ({e}); TCP only")
+    
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if unix_server is not None:
+            unix_server.close()
+            try:
+                os.unlink(UNIX_SOCKET_PATH)
+            except OSError:
+                pass
 
 def start_server():
     """
     Main server loop using Raw TCP Sockets
     """
-    global rag_chain, is_ready
+    global rag_chain, is_ready, _scheduler
     
     print("\n" + "="*60)
     print(f"🚀 STARTING RAG SERVER (Llama 3.2 1B Instruct)")
@@ -119,6 +306,7 @@ def start_server():
                 print("🔗 Creating RAG Chain...")
                 llm = load_llm()
                 rag_chain = create_chatbot(llm, vector_store, k=RETRIEVAL_K)
+                _scheduler = BatchScheduler(_rag_pool)
                 is_ready = True
                 
                 print("\n" + "="*60)
@@ -151,22 +339,20 @@ def start_server():
     # Allow port reuse immediately after stop
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     
+    # Larger kernel buffers (inherited by accepted sockets) so long answers
+    # are not throttled by a small send window
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_BYTES)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_BYTES)
+    
     try:
+        # asyncio calls listen() with LISTEN_BACKLOG once serving starts
         server.bind((SERVER_IP, SERVER_PORT))
-        server.listen(5)
         
         print(f"\n🎧 Listening for TCP connections on {SERVER_IP}:{SERVER_PORT}...")
         print(f"💡 Press Ctrl+C to stop the server\n")
         
-        while True:
-            client_sock, addr = server.accept()
-            # Handle client in a new thread
-            client_handler = threading.Thread(
-                target=handle_client,
-                args=(client_sock, addr),
-                daemon=True
-            )
-            client_handler.start()
+        # Each client connection becomes a coroutine instead of an OS thread
+        asyncio.run(_serve(server))
             
     except KeyboardInterrupt:
         print("\n\n🛑 Server stopping...")
@@ -177,6 +363,7 @@ def start_server():
     finally:
         print("Cleaning up resources...")
         server.close()
+        _rag_pool.shutdown(wait=False)
         cleanup_models()
         print("✓ Server shutdown complete")
 
@@ -11,8 +11,12 @@ import tkinter as tk
 from tkinter import filedialog, scrolledtext, messagebox, ttk
 import threading
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import time
+import uuid
+import bisect
+import queue
 
 # Add current directory to path
 sys.path.append(os.getcwd())
@@ -22,13 +26,58 @@ try:
     from src.model_loader import load_llm, get_embedding_model, preload_models
     from src.document_processor import load_document, load_documents_batch
     from src.text_chunker import chunk_text
-    from src.vector_store import create_vector_store, load_vector_store
-    from src.chatbot import create_chatbot, ask_question, clear_query_cache
+    from src.vector_store import (
+        create_vector_store, load_vector_store, update_vector_store, read_index_manifest
+    )
+    from src.chatbot import create_chatbot, submit_question, invalidate_query_cache
 except ImportError as e:
     messagebox.showerror("Import Error", f"Failed to import backend modules: {e}")
     sys.exit(1)
 
 
+def _copy_file_range(in_fd, out_fd, offset, count):
+    return os.copy_file_range(in_fd, out_fd, count, offset, offset)
+
+def _sendfile(in_fd, out_fd, offset, count):
+    os.lseek(out_fd, offset, os.SEEK_SET)
+    return os.sendfile(out_fd, in_fd, offset, count)
+
+# Kernel-side copy primitives, fastest first (neither exists on Windows)
+_KERNEL_COPIERS = [copier for copier, name in (
+    (_copy_file_range, 'copy_file_range'),
+    (_sendfile, 'sendfile'),
+) if hasattr(os, name)]
+
+def _fast_copy(src, dst):
+    """
+    Copy a file without bouncing the data through userspace buffers:
+    copy_file_range, then sendfile, then shutil.copy2. Metadata is copied
+    like copy2 so mtime-based change detection still sees the original file.
+    """
+    copied = 0
+    size = -1
+    if _KERNEL_COPIERS:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+            size = os.fstat(in_fd).st_size
+            for copier in _KERNEL_COPIERS:
+                try:
+                    while copied < size:
+                        sent = copier(in_fd, out_fd, copied, size - copied)
+                        if sent == 0:
+                            break
+                        copied += sent
+                except OSError:
+                    # e.g. EXDEV/EINVAL on older kernels or unusual filesystems
+                    continue
+                break
+    
+    if copied != size:
+        shutil.copy2(src, dst)
+    else:
+        shutil.copystat(src, dst)
+
+
 class ServerSideRAGGUI:
     """
     Server-Side RAG Chatbot GUI - Document Management & Processing
@@ -57,8 +106,15 @@ class ServerSideRAGGUI:
         self.qa_chain = None
         
         # Processing state
-        self.loaded_documents = []
         self.text_chunks = []
+        self._chunk_ids = []
+        
+        # Per-file fingerprints {path: (mtime_ns, size, [chunk_ids])} so only
+        # changed files are re-chunked; _indexed_state is the snapshot the
+        # current vector store was built from (None = rebuild from scratch)
+        self._file_state = {}
+        self._chunks_by_id = {}
+        self._indexed_state = None
         self.embeddings_ready = False
         self.models_preloaded = False
         self.query_cancelled = False
@@ -70,19 +126,52 @@ class ServerSideRAGGUI:
             'vectordb': False
         }
         
-        # Processing lock to prevent concurrent operations
+        # Guards the check-and-set of is_processing (see _cas_start_processing)
         self._processing_lock = threading.Lock()
         self.is_processing = False
         
-        # Timer for query processing
+        # Sorted model behind doc_listbox, kept in step with it incrementally
+        self._doc_names = []
+        
+        # Timer for query processing, shown in a label under the chat so ticks
+        # don't rewrite the chat Text widget
         self._timer_running = False
+        self._timer_var = tk.StringVar(value="")
+        self._query_started = 0.0
+        
+        # Last time a worker thread posted a progress update (throttling)
+        self._last_progress_post = 0.0
+        
+        # Chat lines waiting for the next batched insert (see _flush_chat)
+        self._chat_queue = queue.SimpleQueue()
+        self._chat_flush_pending = False
         
         # Create UI
+        self._configure_styles()
         self._create_ui()
         
         # Initialize backend in background
         self._init_backend_async()
     
+    # Step progress bar colors (Chunking, Embeddings, Vector DB)
+    STEP_COLORS = ('#00BCD4', '#9C27B0', '#4CAF50')
+    
+    @staticmethod
+    def _progress_style(color):
+        return f"c{color[1:]}.Horizontal.TProgressbar"
+    
+    def _configure_styles(self):
+        """Set the ttk theme and one progress bar style per step color, once"""
+        self._style = ttk.Style()
+        self._style.theme_use('default')
+        for color in self.STEP_COLORS:
+            self._style.configure(
+                self._progress_style(color), 
+                troughcolor='#E0E0E0', 
+                background=color, 
+                thickness=20
+            )
+    
     def _create_ui(self):
         """Create the main UI layout"""
         main_container = tk.Frame(self.master, bg=self.bg_color)
@@ -195,19 +284,10 @@ class ServerSideRAGGUI:
         progress_container = tk.Frame(step_frame, bg='white')
         progress_container.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
-        # Style for progress bar
-        style = ttk.Style()
-        style.theme_use('default')
-        style.configure(
-            "Custom.Horizontal.TProgressbar", 
-            troughcolor='#E0E0E0', 
-            background=color, 
-            thickness=20
-        )
-        
+        # Named style configured once in _configure_styles
         progress = ttk.Progressbar(
             progress_container, 
-            style="Custom.Horizontal.TProgressbar",
+            style=self._progress_style(color),
             mode='determinate', 
             length=150
         )
@@ -309,6 +389,16 @@ class ServerSideRAGGUI:
         self.chat_history.tag_config('error', foreground='#D32F2F', font=('Arial', 10, 'bold'))
         self.chat_history.tag_config('success', foreground='#4CAF50', font=('Arial', 9, 'bold'))
         self.chat_history.tag_config('timer', foreground='#9E9E9E', font=('Arial', 9, 'italic'))
+        
+        self._timer_label = tk.Label(
+            chat_frame,
+            textvariable=self._timer_var,
+            font=('Arial', 9, 'italic'),
+            bg='white',
+            fg='#9E9E9E',
+            anchor='w'
+        )
+        self._timer_label.pack(fill=tk.X)
 
         # Input frame
         input_frame = tk.Frame(parent, bg='white')
@@ -371,15 +461,58 @@ class ServerSideRAGGUI:
 
     def _load_models(self):
         try:
-            success = preload_models()
+            # Reading the saved index overlaps with the model loads
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                preload_future = executor.submit(preload_models)
+                store_future = executor.submit(load_vector_store, self.vector_db_index)
+                success = preload_future.result()
+                vector_store = store_future.result()
             if success:
                 self.llm = load_llm()
-                self.vector_store = load_vector_store(self.vector_db_index)
+                self.vector_store = vector_store
+                if vector_store is not None:
+                    self._restore_indexed_state(vector_store)
                 self.master.after(0, self._on_models_loaded)
             else:
                 self.master.after(0, self._on_models_failed)
         except Exception as e:
-            self.master.after(0, lambda: self._on_models_failed(str(e)))
+            self.master.after(0, self._on_models_failed, str(e))
+    
+    def _restore_indexed_state(self, vector_store):
+        """
+        Reuse the saved index when its manifest matches the current documents,
+        so an unchanged knowledge base does not need Steps 1→2→3 again
+        """
+        paths = [os.path.join(self.documents_dir, f) for f in self._list_documents()]
+        file_chunk_ids = read_index_manifest(self.vector_db_index, paths)
+        if not file_chunk_ids:
+            return
+        
+        state = {}
+        chunks_by_id = {}
+        for path in paths:
+            chunk_ids = file_chunk_ids[path]
+            for cid in chunk_ids:
+                chunk = vector_store.docstore.search(cid)
+                if isinstance(chunk, str):  # docstore reports misses as a message
+                    return
+                chunks_by_id[cid] = chunk
+            st = os.stat(path)
+            state[path] = (st.st_mtime_ns, st.st_size, chunk_ids)
+        
+        self._file_state = state
+        self._indexed_state = dict(state)
+        self._chunks_by_id = chunks_by_id
+        self._chunk_ids = [cid for path in paths for cid in state[path][2]]
+        self.text_chunks = [chunks_by_id[cid] for cid in self._chunk_ids]
+        self.embeddings_ready = True
+        self.qa_chain = create_chatbot(self.llm, vector_store, k=RETRIEVAL_K)
+        self.session_steps_completed = {
+            'chunking': True,
+            'embeddings': True,
+            'vectordb': True
+        }
+        print("✓ Saved index matches current documents; reusing it")
     
     def _on_models_loaded(self):
         """Called when models are successfully loaded"""
@@ -403,6 +536,10 @@ class ServerSideRAGGUI:
         )
         
         if all_steps_done and self.qa_chain:
+            for progress, label in ((self.chunking_progress, self.chunking_percent_label),
+                                    (self.embeddings_progress, self.embeddings_percent_label),
+                                    (self.vectordb_progress, self.vectordb_percent_label)):
+                self._update_progress(progress, label, 100)
             self.ask_btn.config(state='normal')
             self._update_status("✅ System ready! Knowledge base is up-to-date.", '#4CAF50')
             self._append_chat("System: All processing steps completed. Ready to answer questions! 🚀", 'success')
@@ -438,13 +575,53 @@ class ServerSideRAGGUI:
 
     # Continue in next artifact...
     # Document management functions
+    @staticmethod
+    def _is_document_name(name):
+        # Hidden names include in-progress uploads (.tmp.*)
+        return name.lower().endswith(('.pdf', '.docx', '.txt')) and not name.startswith('.')
+    
+    def _list_documents(self):
+        """Sorted names of the supported documents in documents_dir"""
+        with os.scandir(self.documents_dir) as entries:
+            return sorted(
+                entry.name for entry in entries
+                if self._is_document_name(entry.name) and entry.is_file()
+            )
+    
     def _refresh_document_list(self):
         os.makedirs(self.documents_dir, exist_ok=True)
+        # Directory scans can stall on network mounts; keep them off the Tk thread
+        threading.Thread(target=self._scan_documents, daemon=True).start()
+    
+    def _scan_documents(self):
+        try:
+            files = self._list_documents()
+        except OSError as e:
+            print(f"✗ Could not list documents: {e}")
+            return
+        self.master.after(0, self._show_documents, files)
+    
+    def _show_documents(self, files):
+        self._doc_names = files
         self.doc_listbox.delete(0, tk.END)
-        files = [f for f in os.listdir(self.documents_dir) 
-                if f.lower().endswith(('.pdf', '.docx', '.txt'))]
-        for file in sorted(files):
-            self.doc_listbox.insert(tk.END, file)
+        if files:
+            self.doc_listbox.insert(tk.END, *files)
+    
+    def _add_document_name(self, name):
+        """Insert one file into the sorted list without re-sorting or redrawing the rest"""
+        if not self._is_document_name(name):
+            return
+        idx = bisect.bisect_left(self._doc_names, name)
+        if idx < len(self._doc_names) and self._doc_names[idx] == name:
+            return  # Overwritten in place
+        self._doc_names.insert(idx, name)
+        self.doc_listbox.insert(idx, name)
+    
+    def _remove_document_name(self, name):
+        idx = bisect.bisect_left(self._doc_names, name)
+        if idx < len(self._doc_names) and self._doc_names[idx] == name:
+            del self._doc_names[idx]
+            self.doc_listbox.delete(idx)
     
     def _upload_document(self):
         """Handle document upload with atomic operations"""
@@ -479,20 +656,23 @@ class ServerSideRAGGUI:
                     if not response:
                         continue
                 
-                # Atomic copy operation
-                import tempfile
-                temp_dir = tempfile.gettempdir()
-                temp_path = os.path.join(temp_dir, f".temp_{filename}")
-                
-                shutil.copy2(file_path, temp_path)
-                shutil.move(temp_path, destination)
+                # Atomic copy: the temp file sits next to the destination so the
+                # final step is a same-filesystem rename, never a second copy
+                temp_path = os.path.join(self.documents_dir, f".tmp.{uuid.uuid4().hex}.{filename}")
+                try:
+                    _fast_copy(file_path, temp_path)
+                    os.replace(temp_path, destination)
+                except Exception:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
                 uploaded_count += 1
+                self._add_document_name(filename)
                 
             except Exception as e:
                 failed_files.append(f"{filename}: {str(e)}")
         
         if uploaded_count > 0:
-            self._refresh_document_list()
             self._update_status(f"✅ Uploaded {uploaded_count} document(s) successfully.", '#4CAF50')
             self._append_chat(f"System: Uploaded {uploaded_count} new document(s).", 'system')
             self._reset_processing_steps("new documents added")
@@ -535,12 +715,12 @@ class ServerSideRAGGUI:
                 
                 shutil.move(source_path, dest_path)
                 moved_count += 1
+                self._remove_document_name(filename)
                 
             except Exception as e:
                 failed_files.append(f"{filename}: {str(e)}")
         
         if moved_count > 0:
-            self._refresh_document_list()
             self._update_status(f"📦 Moved {moved_count} document(s) to removed_doc folder.", '#FF9800')
             self._append_chat(f"System: Moved {moved_count} document(s) to removed_doc.", 'system')
             self._reset_processing_steps("documents removed")
@@ -552,6 +732,17 @@ class ServerSideRAGGUI:
             )
 
     # Processing steps
+    def _cas_start_processing(self):
+        """
+        Atomically claim is_processing; False if another operation already holds it.
+        The lock only covers the flag, not the worker thread's run.
+        """
+        with self._processing_lock:
+            if self.is_processing:
+                return False
+            self.is_processing = True
+            return True
+
     def _do_chunking(self):
         if self.is_processing:
             return
@@ -561,51 +752,65 @@ class ServerSideRAGGUI:
             messagebox.showwarning("No Documents", "Please upload documents first.")
             return
         
-        with self._processing_lock:
-            self.is_processing = True
-            self._update_status("⚙️ Chunking documents...", '#00BCD4')
-            self.chunking_btn.config(state='disabled')
-            self.chunking_progress['value'] = 0
-            self.chunking_percent_label.config(text="0%")
-            
-            threading.Thread(target=self._run_chunking, args=(files,), daemon=True).start()
+        if not self._cas_start_processing():
+            return
+        
+        self._update_status("⚙️ Chunking documents...", '#00BCD4')
+        self.chunking_btn.config(state='disabled')
+        self.chunking_progress['value'] = 0
+        self.chunking_percent_label.config(text="0%")
+        
+        threading.Thread(target=self._run_chunking, args=(files,), daemon=True).start()
 
     def _run_chunking(self, files):
         try:
             paths = [os.path.join(self.documents_dir, f) for f in files]
             total_files = len(paths)
             
-            self.loaded_documents = []
-            
-            for i, path in enumerate(paths):
-                docs = load_document(path)
-                self.loaded_documents.extend(docs)
-                progress = int(((i + 1) / total_files) * 50)
-                self.master.after(0, lambda p=progress: self._update_progress(
-                    self.chunking_progress, self.chunking_percent_label, p))
+            # Files whose fingerprint is unchanged keep their existing chunks
+            state = {}
+            changed = []
+            for path in paths:
+                st = os.stat(path)
+                fingerprint = (st.st_mtime_ns, st.st_size)
+                previous = self._file_state.get(path)
+                if previous and previous[:2] == fingerprint:
+                    state[path] = previous
+                else:
+                    state[path] = fingerprint + ([],)
+                    changed.append(path)
             
-            self.master.after(0, lambda: self._update_progress(
-                self.chunking_progress, self.chunking_percent_label, 55))
+            if changed:
+                # Loaders spend most of their time in file I/O and C-level parsing,
+                # so files are read concurrently; map() keeps the original order
+                with ThreadPoolExecutor(max_workers=min(8, len(changed))) as executor:
+                    for i, (path, docs) in enumerate(zip(changed, executor.map(load_document, changed))):
+                        chunks = chunk_text(docs)
+                        chunk_ids = [uuid.uuid4().hex for _ in chunks]
+                        self._chunks_by_id.update(zip(chunk_ids, chunks))
+                        state[path] = state[path][:2] + (chunk_ids,)
+                        progress = int(((i + 1) / len(changed)) * 90)
+                        self._post_progress_throttled(
+                            self.chunking_progress, self.chunking_percent_label, progress)
             
-            self.text_chunks = chunk_text(self.loaded_documents)
+            self._chunk_ids = [cid for path in paths for cid in state[path][2]]
+            self._chunks_by_id = {cid: self._chunks_by_id[cid] for cid in self._chunk_ids}
+            self._file_state = state
+            self.text_chunks = [self._chunks_by_id[cid] for cid in self._chunk_ids]
             
-            for progress in range(60, 100, 5):
-                self.master.after(0, lambda p=progress: self._update_progress(
-                    self.chunking_progress, self.chunking_percent_label, p))
-                time.sleep(0.1)
+            self._post_progress(
+                self.chunking_progress, self.chunking_percent_label, 100)
             
-            self.master.after(0, lambda: self._update_progress(
-                self.chunking_progress, self.chunking_percent_label, 100))
-            
-            self.master.after(0, lambda: self._finish_step(
+            self.master.after(0, self._finish_step,
                 self.chunking_btn, self.chunking_progress, 
-                f"Created {len(self.text_chunks)} chunks from {total_files} document(s).", 
-                self.chunking_percent_label, 'chunking'))
+                f"Created {len(self.text_chunks)} chunks from {total_files} document(s) "
+                f"({len(changed)} new or changed).", 
+                self.chunking_percent_label, 'chunking')
                 
         except Exception as e:
-            self.master.after(0, lambda: self._fail_step(
+            self.master.after(0, self._fail_step,
                 self.chunking_btn, self.chunking_progress, str(e), 
-                self.chunking_percent_label))
+                self.chunking_percent_label)
 
     def _do_embeddings(self):
         if self.is_processing:
@@ -619,38 +824,39 @@ class ServerSideRAGGUI:
             )
             return
         
-        with self._processing_lock:
-            self.is_processing = True
-            self._update_status("⚙️ Preparing embeddings...", '#9C27B0')
-            self.embeddings_btn.config(state='disabled')
-            self.embeddings_progress['value'] = 0
-            self.embeddings_percent_label.config(text="0%")
-            
-            threading.Thread(target=self._run_embeddings, daemon=True).start()
+        if not self._cas_start_processing():
+            return
+        
+        self._update_status("⚙️ Preparing embeddings...", '#9C27B0')
+        self.embeddings_btn.config(state='disabled')
+        self.embeddings_progress['value'] = 0
+        self.embeddings_percent_label.config(text="0%")
+        
+        threading.Thread(target=self._run_embeddings, daemon=True).start()
 
     def _run_embeddings(self):
         try:
-            self.master.after(0, lambda: self._update_progress(
-                self.embeddings_progress, self.embeddings_percent_label, 30))
+            self._post_progress(
+                self.embeddings_progress, self.embeddings_percent_label, 30)
             
             if get_embedding_model():
-                self.master.after(0, lambda: self._update_progress(
-                    self.embeddings_progress, self.embeddings_percent_label, 70))
+                self._post_progress(
+                    self.embeddings_progress, self.embeddings_percent_label, 70)
                 self.embeddings_ready = True
                 
-                self.master.after(0, lambda: self._update_progress(
-                    self.embeddings_progress, self.embeddings_percent_label, 100))
+                self._post_progress(
+                    self.embeddings_progress, self.embeddings_percent_label, 100)
                 
-                self.master.after(0, lambda: self._finish_step(
+                self.master.after(0, self._finish_step,
                     self.embeddings_btn, self.embeddings_progress, 
                     "Embeddings ready.", 
-                    self.embeddings_percent_label, 'embeddings'))
+                    self.embeddings_percent_label, 'embeddings')
             else:
                 raise Exception("Embedding model error")
         except Exception as e:
-            self.master.after(0, lambda: self._fail_step(
+            self.master.after(0, self._fail_step,
                 self.embeddings_btn, self.embeddings_progress, str(e), 
-                self.embeddings_percent_label))
+                self.embeddings_percent_label)
 
     def _do_vector_db(self):
         if self.is_processing:
@@ -670,56 +876,68 @@ class ServerSideRAGGUI:
             )
             return
         
-        with self._processing_lock:
-            self.is_processing = True
-            self._update_status("⚙️ Creating Vector DB...", '#4CAF50')
-            self.vectordb_btn.config(state='disabled')
-            self.vectordb_progress['value'] = 0
-            self.vectordb_percent_label.config(text="0%")
-            
-            threading.Thread(target=self._run_vectordb, daemon=True).start()
+        if not self._cas_start_processing():
+            return
+        
+        self._update_status("⚙️ Creating Vector DB...", '#4CAF50')
+        self.vectordb_btn.config(state='disabled')
+        self.vectordb_progress['value'] = 0
+        self.vectordb_percent_label.config(text="0%")
+        
+        threading.Thread(target=self._run_vectordb, daemon=True).start()
 
     def _run_vectordb(self):
         try:
-            for progress in range(0, 16, 3):
-                self.master.after(0, lambda p=progress: self._update_progress(
-                    self.vectordb_progress, self.vectordb_percent_label, p))
-                time.sleep(0.1)
-            
             def progress_callback(current, total):
-                percent = 15 + int((current / total) * 60)
-                self.master.after(0, lambda p=percent: self._update_progress(
-                    self.vectordb_progress, self.vectordb_percent_label, p))
+                percent = int((current / total) * 90)
+                self._post_progress_throttled(
+                    self.vectordb_progress, self.vectordb_percent_label, percent)
             
-            self.vector_store = create_vector_store(
-                self.text_chunks, 
-                index_name=self.vector_db_index,
-                progress_callback=progress_callback
-            )
+            manifest = {path: chunk_ids for path, (_, _, chunk_ids) in self._file_state.items()}
             
-            for progress in range(76, 86, 2):
-                self.master.after(0, lambda p=progress: self._update_progress(
-                    self.vectordb_progress, self.vectordb_percent_label, p))
-                time.sleep(0.1)
+            vector_store = None
+            if self.vector_store is not None and self._indexed_state is not None:
+                # Apply only the delta since the last build
+                indexed_ids = {cid for _, _, ids in self._indexed_state.values() for cid in ids}
+                current_ids = set(self._chunk_ids)
+                new_ids = [cid for cid in self._chunk_ids if cid not in indexed_ids]
+                vector_store = update_vector_store(
+                    self.vector_store,
+                    [self._chunks_by_id[cid] for cid in new_ids],
+                    new_ids,
+                    indexed_ids - current_ids,
+                    index_name=self.vector_db_index,
+                    manifest=manifest
+                )
             
-            self.qa_chain = create_chatbot(self.llm, self.vector_store, k=RETRIEVAL_K)
+            if vector_store is None:
+                # No usable store to patch (or the index type cannot be patched)
+                self._indexed_state = None
+                vector_store = create_vector_store(
+                    self.text_chunks, 
+                    index_name=self.vector_db_index,
+                    progress_callback=progress_callback,
+                    ids=self._chunk_ids,
+                    manifest=manifest
+                )
             
-            for progress in range(86, 100, 3):
-                self.master.after(0, lambda p=progress: self._update_progress(
-                    self.vectordb_progress, self.vectordb_percent_label, p))
-                time.sleep(0.1)
+            if vector_store is None:
+                raise Exception("Vector store creation failed")
+            self.vector_store = vector_store
+            self._indexed_state = dict(self._file_state)
             
-            clear_query_cache()
+            self.qa_chain = create_chatbot(self.llm, self.vector_store, k=RETRIEVAL_K)
+            invalidate_query_cache()
             
-            self.master.after(0, lambda: self._update_progress(
-                self.vectordb_progress, self.vectordb_percent_label, 100))
+            self._post_progress(
+                self.vectordb_progress, self.vectordb_percent_label, 100)
             
             self.master.after(0, self._on_vectordb_complete)
             
         except Exception as e:
-            self.master.after(0, lambda: self._fail_step(
+            self.master.after(0, self._fail_step,
                 self.vectordb_btn, self.vectordb_progress, str(e), 
-                self.vectordb_percent_label))
+                self.vectordb_percent_label)
 
     # Continue in final artifact...
     def _finish_step(self, btn, progress, msg, percent_label=None, step_name=None):
@@ -932,7 +1150,8 @@ class ServerSideRAGGUI:
             messagebox.showwarning("Not Ready", "Please complete processing steps first.")
             return
         
-        self.is_processing = True
+        if not self._cas_start_processing():
+            return
         self.ask_btn.config(state='disabled')
         self._update_status("🔍 Searching knowledge base...", '#2196F3')
 
@@ -942,41 +1161,37 @@ class ServerSideRAGGUI:
         self.query_entry.config(fg='#999999')
         self.placeholder_active = True
         
-        self.chat_history.config(state='normal')
-        self._timer_mark = self.chat_history.index(tk.END + "-1c")
-        self.chat_history.insert(tk.END, '⏱️ 0.0s\n\n', 'timer')
-        self.chat_history.config(state='disabled')
-        self.chat_history.see(tk.END)
-        
-        threading.Thread(target=self._process_query, args=(question,), daemon=True).start()
+        self._process_query(question)
 
     def _process_query(self, question):
-        start_time = time.time()
+        self._query_started = time.time()
         self._timer_running = True
+        self._timer_var.set('⏱️ 0.0s')
         
         def update_timer():
+            # One StringVar write per tick; Tk only redraws the label
             if self._timer_running:
-                try:
-                    elapsed = time.time() - start_time
-                    self.chat_history.config(state='normal')
-                    self.chat_history.delete(f"{self._timer_mark}", f"{self._timer_mark} lineend")
-                    self.chat_history.insert(self._timer_mark, f'⏱️ {elapsed:.1f}s', 'timer')
-                    self.chat_history.config(state='disabled')
-                    self.master.after(100, update_timer)
-                except:
-                    pass
+                elapsed = time.time() - self._query_started
+                self._timer_var.set(f'⏱️ {elapsed:.1f}s')
+                self.master.after(200, update_timer)
         
-        self.master.after(100, update_timer)
+        self.master.after(200, update_timer)
         
+        # Runs on the chatbot's shared event loop; no thread per question
+        future = submit_question(self.qa_chain, question)
+        future.add_done_callback(self._on_query_done)
+    
+    def _on_query_done(self, future):
+        self._timer_running = False
         try:
-            response = ask_question(self.qa_chain, question)
-            self._timer_running = False
-            self.master.after(0, lambda: self._display_answer(response))
+            self.master.after(0, self._display_answer, future.result())
         except Exception as e:
-            self._timer_running = False
-            self.master.after(0, lambda: self._display_answer(str(e), is_error=True))
+            self.master.after(0, self._display_answer, str(e), True)
 
     def _display_answer(self, response, is_error=False):
+        # The final time goes into the transcript once, above the answer
+        self._timer_var.set('')
+        self._append_chat(f"⏱️ {time.time() - self._query_started:.1f}s", 'timer')
         if is_error:
             self._append_chat(f"Bot: ❌ {response}", 'error')
             self._update_status("❌ Error occurred.", '#F44336')
@@ -989,6 +1204,8 @@ class ServerSideRAGGUI:
         self.query_entry.focus()
 
     def _clear_chat(self):
+        while not self._chat_queue.empty():
+            self._chat_queue.get_nowait()
         self.chat_history.config(state='normal')
         self.chat_history.delete(1.0, tk.END)
         self.chat_history.config(state='disabled')
@@ -999,6 +1216,21 @@ class ServerSideRAGGUI:
         percent_label.config(text=f"{int(value)}%")
         self.master.update_idletasks()
 
+    def _post_progress_throttled(self, progress_bar, percent_label, value):
+        """
+        Post a progress update from a worker thread at most ~20 times per second.
+        Terminal (100%) updates are posted directly by the callers.
+        """
+        now = time.monotonic()
+        if now - self._last_progress_post < 0.05:
+            return
+        self._last_progress_post = now
+        self._post_progress(progress_bar, percent_label, value)
+    
+    def _post_progress(self, progress_bar, percent_label, value):
+        """Schedule a progress update from a worker thread (Tk's args form, no closure)"""
+        self.master.after(0, self._update_progress, progress_bar, percent_label, value)
+
     def _finish_step(self, btn, progress, msg, percent_label=None, step_name=None):
         progress['value'] = 100
         if percent_label:
@@ -1013,16 +1245,60 @@ class ServerSideRAGGUI:
         self._append_chat(f"System: {msg}", 'system')
 
     def _append_chat(self, message, tag=None):
+        self._chat_queue.put((message, tag))
+        if not self._chat_flush_pending:
+            self._chat_flush_pending = True
+            self.master.after(50, self._flush_chat)
+    
+    def _flush_chat(self):
+        """Write all queued chat lines with a single insert call"""
+        self._chat_flush_pending = False
+        args = []
+        while True:
+            try:
+                message, tag = self._chat_queue.get_nowait()
+            except queue.Empty:
+                break
+            if args and args[-1] == (tag or ()):
+                args[-2] += message + '\n\n'  # Extend the current run of this tag
+            else:
+                args += [message + '\n\n', tag or ()]
+        if not args:
+            return
+        
         self.chat_history.config(state='normal')
-        self.chat_history.insert(tk.END, message + '\n\n', tag)
+        self.chat_history.insert(tk.END, *args)
         self.chat_history.config(state='disabled')
         self.chat_history.see(tk.END)
     
     def _update_status(self, message, color='#666'):
         self.status_label.config(text=message, fg=color)
 
+    def _documents_unchanged(self):
+        """True when the documents on disk match what the current index was built from"""
+        if self._indexed_state is None or self.qa_chain is None:
+            return False
+        # Read the directory itself; the listbox refresh may still be in flight
+        paths = [os.path.join(self.documents_dir, f) for f in self._list_documents()]
+        if set(paths) != set(self._indexed_state):
+            return False
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if (st.st_mtime_ns, st.st_size) != self._indexed_state[path][:2]:
+                return False
+        return True
+
     def _reset_processing_steps(self, reason="document change"):
-        self.loaded_documents = []
+        if self._documents_unchanged():
+            # e.g. re-uploading an identical file: the knowledge base is still current
+            self._append_chat(f"System: {reason.capitalize()}, but no content changed. Knowledge base is up-to-date.", 'system')
+            return
+        
+        # Per-file chunk state is kept, so re-running the steps only
+        # processes the files that actually changed
         self.text_chunks = []
         self.embeddings_ready = False
         self.qa_chain = None
@@ -9,22 +9,22 @@ from src.vector_store import create_vector_store
 from src.chatbot import create_chatbot, ask_question
 from src.config import DOCUMENTS_DIR, VECTOR_INDEX_NAME
 
+SUPPORTED_EXTENSIONS = frozenset({'.pdf', '.docx', '.txt'})
+
 def get_all_documents(doc_dir):
     """
     Get all supported document paths from the directory
     """
-    supported_extensions = ('.pdf', '.docx', '.txt')
-    files = []
-    
     if not os.path.exists(doc_dir):
         os.makedirs(doc_dir)
         return []
-        
-    for f in os.listdir(doc_dir):
-        if f.lower().endswith(supported_extensions):
-            files.append(os.path.join(doc_dir, f))
-            
-    return files
+    
+    # scandir entries carry the name and file type, so no extra stat per file
+    with os.scandir(doc_dir) as entries:
+        return [
+            entry.path for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS and entry.is_file()
+        ]
 
 def main():
     print("--- Offline RAG Chatbot (Batch Processing) ---")
@@ -1,16 +1,184 @@
 # src/chatbot.py
 
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
+import os
+import atexit
+import asyncio
+import concurrent.futures
 import hashlib
+import logging
 import re
-from collections import OrderedDict
-from src.config import RETRIEVAL_K, ENABLE_QUERY_CACHE, CACHE_SIZE
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, Counter
+from operator import itemgetter
+import numpy as np
+from src.model_loader import get_event_loop
+from src.config import (
+    RETRIEVAL_K,
+    DEBUG_RETRIEVAL,
+    ENABLE_QUERY_CACHE,
+    CACHE_SIZE,
+    PERSIST_QUERY_CACHE,
+    QUERY_CACHE_PATH,
+    ENABLE_SEMANTIC_CACHE,
+    SEMANTIC_CACHE_THRESHOLD
+)
+
+# Per-question retrieval details; silent unless DEBUG_RETRIEVAL is set
+logger = logging.getLogger(__name__)
+if DEBUG_RETRIEVAL:
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(logging.StreamHandler())
 
 # Query result cache (LRU)
 _query_cache = OrderedDict()
 
+class _SemanticCache:
+    """
+    Ring buffer of L2-normalized question embeddings and their answers.
+    A lookup is a single matrix-vector product over the filled rows.
+    """
+    
+    def __init__(self, capacity, threshold):
+        self._capacity = capacity
+        self._threshold = threshold
+        self._vectors = None  # Allocated on first insert, once the dimension is known
+        self._answers = [None] * capacity
+        self._count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    @staticmethod
+    def quantize(vector):
+        """
+        Symmetric int8 encoding of a unit vector (components lie in [-1, 1]);
+        the error is well below what matters at a 0.93 threshold
+        """
+        return np.round(vector * 127).astype(np.int8).tobytes()
+    
+    @classmethod
+    def dequantize(cls, blob):
+        return cls.normalize(np.frombuffer(blob, dtype=np.int8).astype(np.float32))
+    
+    def lookup(self, vector):
+        """Answer of the most similar cached question, or None below the threshold"""
+        with self._lock:
+            if not self._count or self._vectors.shape[1] != vector.shape[0]:
+                return None
+            scores = self._vectors[:self._count] @ vector
+            best = int(scores.argmax())
+            if scores[best] >= self._threshold:
+                return self._answers[best]
+        return None
+    
+    def add(self, vector, answer):
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.empty((self._capacity, vector.shape[0]), dtype=np.float32)
+                self._count = 0
+                self._next = 0
+            # Overwrite the oldest row in place; no reallocation on eviction
+            self._vectors[self._next] = vector
+            self._answers[self._next] = answer
+            self._next = (self._next + 1) % self._capacity
+            self._count = min(self._count + 1, self._capacity)
+    
+    def clear(self):
+        with self._lock:
+            self._answers = [None] * self._capacity
+            self._count = 0
+            self._next = 0
+
+# Rolling hash over 5-word phrases for repetition detection
+_PHRASE_WORDS = 5
+_HASH_BASE = 1000003
+_HASH_MOD = (1 << 61) - 1
+_HASH_TOP = pow(_HASH_BASE, _PHRASE_WORDS - 1, _HASH_MOD)  # Weight of the word leaving the window
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Prompt fragments the model sometimes echoes back; everything from the first one is cut
+_LEAK_RE = re.compile(
+    r'\n\s*(?:Question:|Context:|User:|Assistant:|Rules:|Answer based)',
+    re.IGNORECASE
+)
+
+# Phrases that signal an answer from general knowledge instead of the documents
+_GENERIC_INDICATORS_RE = re.compile(
+    '|'.join(re.escape(indicator) for indicator in (
+        "as an ai",
+        "i'm an ai",
+        "i can help you with",
+        "here are some general",
+        "typically,",
+        "generally speaking",
+        "in general,",
+        "commonly,",
+        "it is widely known",
+        "based on my training",
+        "from what i know"
+    )),
+    re.IGNORECASE
+)
+
+_semantic_cache = _SemanticCache(CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD)
+
+# Persistent copy of the query cache, opened and loaded on first use
+_cache_db = None
+_cache_db_loaded = False
+_cache_db_lock = threading.Lock()
+_CACHE_DB_VERSION = 3  # Bump when the stored key, embedding encoding or columns change
+_pending_touches = {}  # hash -> last hit time, written with the next cache write
+_pending_writes = []  # (sql, params) queued by cache-hit paths, written with the next cache write
+_answer_sources = {}  # hash -> fingerprint of the chunks the answer was generated from
+_stale_answers = set()  # hashes cached before the last index rebuild, pending revalidation
+_chain_parts = None  # (id(chain), retriever, answer_chain) of the latest create_chatbot chain
+_embedding_model = None  # Embeddings of the current vector store (set by create_chatbot)
+_query_embedder = None  # Its embed_query
+
+# Optimized prompt for Llama 3.2 1B - short and direct (parsed once at import)
+_PROMPT = PromptTemplate.from_template("""You are a helpful AI assistant.
+Use the following pieces of context to answer the user's question.
+If the answer is present in the context, output it directly.
+If the answer is NOT in the context, say "I don't have that information."
+
+Context:
+{context}
+
+Question: {question}
+
+Answer:""")
+
+# Stop sequences to prevent repetition and prompt leakage
+_STOP = [
+    "\n\nQuestion:", 
+    "\n\nContext:", 
+    "\nQuestion:",
+    "User:",
+    "Assistant:",
+]
+
+_llm_bound = (None, None)  # (llm, llm.bind(stop=_STOP)) for the last LLM seen
+
+def _bind_stop(llm):
+    """LLM with the stop sequences bound, reused while the same LLM instance is passed in"""
+    global _llm_bound
+    bound_for, bound = _llm_bound
+    if bound_for is not llm:
+        bound = llm.bind(stop=_STOP)
+        _llm_bound = (llm, bound)
+    return bound
+
 def create_chatbot(llm, vector_store, k=RETRIEVAL_K):
     """
     Create RAG chain optimized for Llama 3.2 1B Instruct
@@ -24,47 +192,46 @@ def create_chatbot(llm, vector_store, k=RETRIEVAL_K):
     print(f"{'='*60}")
     print(f"Retrieval k: {k} documents")
     
+    # Open and load the SQLite cache now rather than in the first lookup,
+    # which may run on the server's event loop
+    _load_persistent_cache()
+    
+    global _embedding_model, _query_embedder
+    _embedding_model = vector_store.embedding_function
+    _query_embedder = getattr(_embedding_model, 'embed_query', _embedding_model)
+    
     retriever = vector_store.as_retriever(
         search_type="similarity",
         search_kwargs={'k': k}
     )
     
-    # Optimized prompt for Llama 3.2 1B - short and direct
-    template = """You are a helpful AI assistant.
-Use the following pieces of context to answer the user's question.
-If the answer is present in the context, output it directly.
-If the answer is NOT in the context, say "I don't have that information."
-
-Context:
-{context}
-
-Question: {question}
-
-Answer:"""
+    llm_with_stop = _bind_stop(llm)
     
-    prompt = PromptTemplate.from_template(template)
+    context = RunnableLambda(itemgetter("docs")) | _format_docs
+    if DEBUG_RETRIEVAL:
+        context = context | (lambda x: (_debug_print_context(x), x)[1])
     
-    # Stop sequences to prevent repetition and prompt leakage
-    llm_with_stop = llm.bind(
-        stop=[
-            "\n\nQuestion:", 
-            "\n\nContext:", 
-            "\nQuestion:",
-            "User:",
-            "Assistant:",
-        ]
-    )
-    
-    rag_chain = (
+    # Generation from already-retrieved chunks, so a stale cache entry can be
+    # re-checked with retrieval alone and only reach the LLM if its sources moved
+    answer_chain = (
         {
-            "context": retriever | _format_docs | (lambda x: (_debug_print_context(x), x)[1]),
-            "question": RunnablePassthrough()
+            "context": context,
+            "question": itemgetter("question")
         }
-        | prompt
+        | _PROMPT
         | llm_with_stop
         | StrOutputParser()
     )
     
+    # Returns {"docs", "question", "answer"}; ask_question* unwrap the answer
+    rag_chain = (
+        RunnableParallel(docs=retriever, question=RunnablePassthrough())
+        | RunnablePassthrough.assign(answer=answer_chain)
+    )
+    
+    global _chain_parts
+    _chain_parts = (id(rag_chain), retriever, answer_chain)
+    
     print(f"{'='*60}")
     print("✓ RAG CHAIN READY")
     print(f"{'='*60}\n")
@@ -78,49 +245,300 @@ def _format_docs(docs):
     if not docs:
         return "No relevant documents found."
     
-    print(f"\n[DEBUG] Retrieved {len(docs)} chunks")
+    logger.debug("Retrieved %d chunks", len(docs))
     
     # Deduplicate similar chunks
     unique_docs = []
     seen_content = set()
     
     for doc in docs:
-        fingerprint = doc.page_content[:200].strip()  # Use 200 chars for better dedup
+        # Use 200 chars for better dedup; the set holds int hashes, not the strings
+        fingerprint = hash(doc.page_content[:200].strip())
         if fingerprint not in seen_content:
             unique_docs.append(doc)
             seen_content.add(fingerprint)
     
-    print(f"[DEBUG] After deduplication: {len(unique_docs)} unique chunks")
+    logger.debug("After deduplication: %d unique chunks", len(unique_docs))
     
     # Reduced context for 1B model (4K tokens = ~16K chars max)
     MAX_CONTEXT_LENGTH = 12000  
     
+    # Stop formatting once the budget is used up instead of joining
+    # everything and slicing most of it away
     formatted_docs = []
+    length = -2  # No separator before the first entry
     for doc in unique_docs:
-        content = doc.page_content.strip()
-        content = ' '.join(content.split())  # Remove excessive whitespace
+        content = _WHITESPACE_RE.sub(' ', doc.page_content).strip()  # Remove excessive whitespace
         formatted_docs.append(f"- {content}")
+        length += len(formatted_docs[-1]) + 2
+        if length > MAX_CONTEXT_LENGTH:
+            break
     
     formatted = "\n\n".join(formatted_docs)
     
-    if len(formatted) > MAX_CONTEXT_LENGTH:
+    if length > MAX_CONTEXT_LENGTH:
         formatted = formatted[:MAX_CONTEXT_LENGTH]
         formatted += "\n[... truncated ...]"
     
     return formatted
 
 def _debug_print_context(formatted_text):
-    print("\n" + "="*40)
-    print("DEBUG: RETRIEVED CONTEXT START")
-    print("="*40)
-    print(formatted_text[:1000] + "... [truncated]" if len(formatted_text) > 1000 else formatted_text)
-    print("="*40)
-    print("DEBUG: RETRIEVED CONTEXT END")
-    print("="*40 + "\n")
+    logger.debug(
+        "Retrieved context:\n%s",
+        formatted_text[:1000] + "... [truncated]" if len(formatted_text) > 1000 else formatted_text
+    )
 
-def ask_question(chain, query, timeout=60):
+def _query_key(query):
+    """
+    Cache key for a question (case/whitespace-insensitive)
+    """
+    query = query.strip()
+    if query.isascii() and query.islower():
+        buf = query.encode('ascii')  # Already normalized: no lowercased copy
+    else:
+        buf = query.lower().encode()
+    # Only a dict key: 8-byte BLAKE2b is faster than MD5 and gives shorter keys
+    return hashlib.blake2b(buf, digest_size=8).hexdigest()
+
+def _load_persistent_cache():
+    """
+    Open the SQLite query cache and load its newest entries into memory (first call only)
+    """
+    global _cache_db, _cache_db_loaded
+    if _cache_db_loaded:
+        return
+    with _cache_db_lock:
+        if _cache_db_loaded:
+            return
+        _cache_db_loaded = True
+        if not (ENABLE_QUERY_CACHE and PERSIST_QUERY_CACHE):
+            return
+        try:
+            os.makedirs(os.path.dirname(QUERY_CACHE_PATH) or '.', exist_ok=True)
+            conn = sqlite3.connect(QUERY_CACHE_PATH, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _CACHE_DB_VERSION:
+                # Older embedding encoding; it is only a cache, so start over
+                conn.execute("DROP TABLE IF EXISTS qcache")
+                conn.execute(f"PRAGMA user_version = {_CACHE_DB_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS qcache "
+                "(hash TEXT PRIMARY KEY, answer TEXT, emb BLOB, sources TEXT, stale INTEGER, ts REAL)"
+            )
+            rows = conn.execute(
+                "SELECT hash, answer, emb, sources, stale FROM qcache ORDER BY ts DESC LIMIT ?",
+                (CACHE_SIZE,)
+            ).fetchall()
+            # Oldest first, so the most recent entries end up most recently used
+            for query_hash, answer, emb, sources, stale in reversed(rows):
+                _query_cache[query_hash] = answer
+                if sources:
+                    _answer_sources[query_hash] = sources
+                if stale:
+                    _stale_answers.add(query_hash)
+                elif emb:
+                    _semantic_cache.add(_SemanticCache.dequantize(emb), answer)
+            # Entries that no longer fit in memory are dropped from disk too
+            conn.execute(
+                "DELETE FROM qcache WHERE hash NOT IN "
+                "(SELECT hash FROM qcache ORDER BY ts DESC LIMIT ?)", (CACHE_SIZE,)
+            )
+            conn.commit()
+            _cache_db = conn
+            atexit.register(_persist)
+            if rows:
+                print(f"✓ Loaded {len(rows)} cached answers from disk")
+        except sqlite3.Error as e:
+            print(f"⚠️ Persistent query cache unavailable: {e}")
+
+def _persist(sql=None, params=(), defer=False):
     """
-    Ask question with timeout and repetition detection
+    Run one write against the persistent cache, together with any LRU
+    timestamp refreshes and writes that cache hits have deferred.
+    defer=True only queues the write (hit paths running on an event loop).
+    """
+    global _pending_touches, _pending_writes
+    if _cache_db is None:
+        return
+    if defer:
+        _pending_writes.append((sql, params))
+        return
+    with _cache_db_lock:
+        touches, _pending_touches = _pending_touches, {}
+        writes, _pending_writes = _pending_writes, []
+        try:
+            for queued_sql, queued_params in writes:
+                _cache_db.execute(queued_sql, queued_params)
+            if touches:
+                _cache_db.executemany(
+                    "UPDATE qcache SET ts = ? WHERE hash = ?",
+                    [(ts, query_hash) for query_hash, ts in touches.items()]
+                )
+            if sql:
+                _cache_db.execute(sql, params)
+            _cache_db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not update persistent query cache: {e}")
+
+def _cache_answer(query_hash, answer, query_vector=None, sources=None, defer=False):
+    # Cache result with LRU eviction
+    _query_cache[query_hash] = answer
+    _stale_answers.discard(query_hash)
+    if sources:
+        _answer_sources[query_hash] = sources
+    else:
+        _answer_sources.pop(query_hash, None)
+    if len(_query_cache) > CACHE_SIZE:
+        evicted, _ = _query_cache.popitem(last=False)  # Remove oldest
+        _answer_sources.pop(evicted, None)
+        _stale_answers.discard(evicted)
+    
+    # int8 stores the embedding in a quarter of the float32 size
+    emb = _SemanticCache.quantize(query_vector) if query_vector is not None else None
+    _persist(
+        "INSERT OR REPLACE INTO qcache (hash, answer, emb, sources, stale, ts) VALUES (?, ?, ?, ?, 0, ?)",
+        (query_hash, answer, emb, sources, time.time()),
+        defer=defer
+    )
+
+def _exact_lookup(query_hash):
+    """
+    Exact-match cache hit (refreshing its LRU position), or None
+    """
+    if not ENABLE_QUERY_CACHE:
+        return None
+    _load_persistent_cache()
+    if query_hash in _stale_answers:
+        return None  # Needs a retrieval pass first (_revalidate)
+    answer = _query_cache.get(query_hash)
+    if answer is not None:
+        try:
+            _query_cache.move_to_end(query_hash)  # Refresh LRU position
+        except KeyError:
+            pass  # Evicted concurrently by a worker thread
+        # No disk write on the hit path; flushed with the next write or at exit
+        _pending_touches[query_hash] = time.time()
+    return answer
+
+def _sources_key(docs):
+    """
+    Fingerprint of a retrieved chunk set (docstore ids; content hash for id-less chunks)
+    """
+    ids = sorted(
+        getattr(doc, 'id', None)
+        or hashlib.blake2b(doc.page_content.encode('utf-8'), digest_size=8).hexdigest()
+        for doc in docs
+    )
+    return hashlib.blake2b('\0'.join(ids).encode('utf-8'), digest_size=8).hexdigest()
+
+def _stale_parts(chain, query_hash):
+    """
+    (retriever, answer_chain) if query_hash has a stale answer that can be
+    re-checked against this chain, else None
+    """
+    if not ENABLE_QUERY_CACHE or query_hash not in _stale_answers:
+        return None
+    if _chain_parts is None or _chain_parts[0] != id(chain) or query_hash not in _answer_sources:
+        return None
+    return _chain_parts[1:]
+
+def _revalidated(query_hash, docs):
+    """
+    Stale cached answer if retrieval still returns the chunks it was generated from, else None
+    """
+    answer = _query_cache.get(query_hash)
+    if answer is None or _sources_key(docs) != _answer_sources.get(query_hash):
+        return None
+    _stale_answers.discard(query_hash)
+    _persist("UPDATE qcache SET stale = 0, ts = ? WHERE hash = ?", (time.time(), query_hash), defer=True)
+    print("⚡ Cache hit (sources unchanged)")
+    return answer
+
+def _embed_query(query):
+    """
+    Normalized question embedding for the semantic cache, or None when unavailable
+    """
+    if not (ENABLE_QUERY_CACHE and ENABLE_SEMANTIC_CACHE) or _query_embedder is None:
+        return None
+    try:
+        return _SemanticCache.normalize(_query_embedder(query.strip()))
+    except Exception as e:
+        print(f"⚠️ Semantic cache skipped: {e}")
+        return None
+
+async def _embed_query_async(query):
+    if not (ENABLE_QUERY_CACHE and ENABLE_SEMANTIC_CACHE) or _query_embedder is None:
+        return None
+    try:
+        aembed_query = getattr(_embedding_model, 'aembed_query', None)
+        if aembed_query is not None:
+            vector = await aembed_query(query.strip())
+        else:
+            vector = await asyncio.to_thread(_query_embedder, query.strip())
+        return _SemanticCache.normalize(vector)
+    except Exception as e:
+        print(f"⚠️ Semantic cache skipped: {e}")
+        return None
+
+def _semantic_lookup(query_hash, query_vector):
+    """
+    Answer cached for a similarly worded question (promoted into the exact cache)
+    """
+    if query_vector is None:
+        return None
+    answer = _semantic_cache.lookup(query_vector)
+    if answer is not None:
+        print("⚡ Semantic cache hit")
+        _cache_answer(query_hash, answer, defer=True)  # No disk write on the hit path
+    return answer
+
+def _finish_answer(query_hash, result, query_vector=None, sources=None):
+    """
+    Post-process a raw chain answer and store it in the LRU and semantic caches
+    """
+    if isinstance(result, str):
+        result = _postprocess(result)
+    
+    if ENABLE_QUERY_CACHE and result:
+        _cache_answer(query_hash, result, query_vector, sources)
+        if query_vector is not None:
+            _semantic_cache.add(query_vector, result)
+    
+    return result
+
+def get_cached_answer(query):
+    """
+    Return the cached answer for a question, or None on a cache miss.
+    Exact matches only: the semantic layer needs an embedding call, which
+    callers on an event loop must not block on.
+    """
+    if not ENABLE_QUERY_CACHE or not query or not query.strip():
+        return None
+    
+    return _exact_lookup(_query_key(query))
+
+async def _generate(chain, query, query_hash):
+    """
+    Raw answer and its sources fingerprint; (cached answer, None) when a stale
+    entry's retrieval matches what it was generated from (no LLM call)
+    """
+    parts = _stale_parts(chain, query_hash)
+    if parts is None:
+        output = await chain.ainvoke(query)
+        return output["answer"], _sources_key(output["docs"])
+    
+    retriever, answer_chain = parts
+    docs = await retriever.ainvoke(query)
+    cached = _revalidated(query_hash, docs)
+    if cached is not None:
+        return cached, None
+    answer = await answer_chain.ainvoke({"docs": docs, "question": query})
+    return answer, _sources_key(docs)
+
+async def ask_question_async(chain, query, timeout=60):
+    """
+    Ask question with timeout and repetition detection (coroutine version)
     """
     if not chain:
         return "⚠️ Chatbot not initialized."
@@ -128,58 +546,139 @@ def ask_question(chain, query, timeout=60):
     if not query or not query.strip():
         return "⚠️ Please provide a valid question."
     
-    query_normalized = query.strip().lower()
-    query_hash = hashlib.md5(query_normalized.encode()).hexdigest()
+    query_hash = _query_key(query)
     
     # Check cache
-    if ENABLE_QUERY_CACHE and query_hash in _query_cache:
-        print("⚡ Cache hit")
-        return _query_cache[query_hash]
+    cached = _exact_lookup(query_hash)
+    if cached is not None:
+        logger.debug("Cache hit")
+        return cached
+    
+    query_vector = await _embed_query_async(query)
+    cached = _semantic_lookup(query_hash, query_vector)
+    if cached is not None:
+        return cached
     
     try:
-        print(f"🔍 Processing query: '{query}'")
+        logger.debug("Processing query: %r", query)
+        
+        try:
+            # Cancels the in-flight LLM request on timeout
+            result, sources = await asyncio.wait_for(_generate(chain, query, query_hash), timeout)
+        except asyncio.TimeoutError:
+            print("⏱️ Query timeout - no relevant context found")
+            return "I don't have that information in the provided documents."
+        
+        if sources is None:
+            return result
+        return _finish_answer(query_hash, result, query_vector, sources)
+        
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return "I encountered an error processing your request."
+
+def submit_question(chain, query, timeout=60):
+    """
+    Schedule ask_question_async on the shared loop; returns a concurrent Future
+    """
+    return asyncio.run_coroutine_threadsafe(ask_question_async(chain, query, timeout), get_event_loop())
+
+def ask_question(chain, query, timeout=60):
+    """
+    Ask question with timeout and repetition detection (blocking)
+    """
+    return submit_question(chain, query, timeout).result()
+
+def ask_questions(chain, queries, timeout=60):
+    """
+    Answer several questions with a single batched chain call.
+    Cache hits and invalid questions are resolved without touching the LLM.
+    """
+    if not chain:
+        return ["⚠️ Chatbot not initialized."] * len(queries)
+    
+    answers = [None] * len(queries)
+    pending = []
+    
+    for i, query in enumerate(queries):
+        if not query or not query.strip():
+            answers[i] = "⚠️ Please provide a valid question."
+            continue
         
-        # Add timeout wrapper
-        import concurrent.futures
+        query_hash = _query_key(query)
+        cached = _exact_lookup(query_hash)
+        if cached is not None:
+            print("⚡ Cache hit")
+            answers[i] = cached
+            continue
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(chain.invoke, query)
+        parts = _stale_parts(chain, query_hash)
+        if parts is not None:
             try:
-                result = future.result(timeout=timeout)
-            except concurrent.futures.TimeoutError:
-                print("⏱️ Query timeout - no relevant context found")
-                return "I don't have that information in the provided documents."
+                cached = _revalidated(query_hash, parts[0].invoke(query))
+            except Exception as e:
+                print(f"⚠️ Cache revalidation failed: {e}")
+                cached = None
+            if cached is not None:
+                answers[i] = cached
+                continue
+        
+        query_vector = _embed_query(query)
+        cached = _semantic_lookup(query_hash, query_vector)
+        if cached is not None:
+            answers[i] = cached
+            continue
         
-        if isinstance(result, str):
-            result = _clean_response(result)
-            result = _detect_repetition(result)
-            result = _validate_context_response(result)
+        pending.append((i, query, query_hash, query_vector))
+    
+    if not pending:
+        return answers
+    
+    try:
+        print(f"🔍 Processing batch of {len(pending)} queries")
         
-        # Cache result with LRU eviction
-        if ENABLE_QUERY_CACHE and result:
-            _query_cache[query_hash] = result
-            if len(_query_cache) > CACHE_SIZE:
-                _query_cache.popitem(last=False)  # Remove oldest
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(chain.abatch([query for _, query, _, _ in pending]), timeout),
+            get_event_loop()
+        )
+        try:
+            results = future.result()
+        except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+            # Both are the builtin TimeoutError on 3.11+, distinct before that
+            print("⏱️ Batch timeout - no relevant context found")
+            results = None
         
-        return result
+        for (i, _, query_hash, query_vector), result in zip(pending, results or [None] * len(pending)):
+            if result is None:
+                answers[i] = "I don't have that information in the provided documents."
+            else:
+                answers[i] = _finish_answer(
+                    query_hash, result["answer"], query_vector, _sources_key(result["docs"])
+                )
         
     except Exception as e:
         print(f"✗ Error: {str(e)}")
-        return "I encountered an error processing your request."
+        for i, _, _, _ in pending:
+            answers[i] = "I encountered an error processing your request."
+    
+    return answers
 
-def _detect_repetition(response):
+def _truncate_repetition(response, lowered):
     """
-    Detect and truncate repetitive responses
+    Detect and truncate repetitive responses. Takes the response and its
+    lowercased copy and returns both, truncated alike, so callers can keep
+    working on the lowercase text
     """
     if not response or len(response) < 100:
-        return response
+        return response, lowered
     
-    # Split into sentences
+    # Split into sentences (lower() never adds or removes '.', so both splits line up)
     sentences = response.split('.')
     
     # Check if same sentence pattern repeats
     if len(sentences) > 3:
-        last_three = [s.strip().lower() for s in sentences[-4:-1] if s.strip()]
+        lowered_sentences = lowered.split('.')
+        last_three = [s.strip() for s in lowered_sentences[-4:-1] if s.strip()]
         
         if len(last_three) == 3:
             # Check for repetition patterns
@@ -188,24 +687,35 @@ def _detect_repetition(response):
                 all(len(set(s.split()[:5])) < 3 for s in last_three)):
                 
                 print("⚠️ Repetition detected - truncating response")
-                return '. '.join(sentences[:len(sentences)//2]) + '.'
+                half = len(sentences) // 2
+                return ('. '.join(sentences[:half]) + '.',
+                        '. '.join(lowered_sentences[:half]) + '.')
     
     # Check for phrase repetition
-    words = response.lower().split()
+    words = lowered.split()
     if len(words) > 20:
-        phrases = [' '.join(words[i:i+5]) for i in range(len(words)-5)]
-        phrase_counts = {}
-        for phrase in phrases:
-            phrase_counts[phrase] = phrase_counts.get(phrase, 0) + 1
+        # Phrases are compared by a rolling hash over interned word ids, so no
+        # per-phrase strings are built
+        word_ids = {}
+        tokens = [word_ids.setdefault(word, len(word_ids) + 1) for word in words]
         
-        if any(count > 2 for count in phrase_counts.values()):
-            print("⚠️ Phrase repetition detected - truncating")
-            for i, phrase in enumerate(phrases):
-                if phrase_counts[phrase] > 2:
-                    cut_point = i * 5 + len(phrases[i].split())
-                    return ' '.join(words[:cut_point]) + '.'
+        h = 0
+        for token in tokens[:_PHRASE_WORDS]:
+            h = (h * _HASH_BASE + token) % _HASH_MOD
+        hashes = [h]
+        for i in range(1, len(words) - _PHRASE_WORDS):
+            h = ((h - tokens[i - 1] * _HASH_TOP) * _HASH_BASE + tokens[i + _PHRASE_WORDS - 1]) % _HASH_MOD
+            hashes.append(h)
+        phrase_counts = Counter(hashes)
+        
+        for i, h in enumerate(hashes):
+            if phrase_counts[h] > 2:
+                print("⚠️ Phrase repetition detected - truncating")
+                cut_point = i * 5 + _PHRASE_WORDS
+                truncated = ' '.join(words[:cut_point]) + '.'
+                return truncated, truncated
     
-    return response
+    return response, lowered
 
 def _clean_response(response):
     """
@@ -213,53 +723,22 @@ def _clean_response(response):
     """
     response = response.strip()
     
-    # Remove leaked prompt patterns
-    leak_patterns = [
-        r'\n\s*Question:',
-        r'\n\s*Context:',
-        r'\n\s*User:',
-        r'\n\s*Assistant:',
-        r'\n\s*Rules:',
-        r'\n\s*Answer based'
-    ]
-    
-    for pattern in leak_patterns:
-        match = re.search(pattern, response, re.IGNORECASE)
-        if match:
-            response = response[:match.start()].strip()
+    # Remove leaked prompt patterns (one pass finds the earliest of them)
+    match = _LEAK_RE.search(response)
+    if match:
+        response = response[:match.start()]
     
     return response.strip()
 
-def _validate_context_response(response):
+def _postprocess(response):
     """
-    Ensure response is from context, not general knowledge
+    Clean the response, truncate repetition and reject general-knowledge
+    answers; the response is lowercased once and both later checks share that copy
     """
-    generic_indicators = [
-        "as an ai",
-        "i'm an ai",
-        "i can help you with",
-        "here are some general",
-        "typically,",
-        "generally speaking",
-        "in general,",
-        "commonly,",
-        "it is widely known",
-        "based on my training",
-        "from what i know"
-    ]
-    
-    response_lower = response.lower()
-    
-    for indicator in generic_indicators:
-        if indicator in response_lower:
-            return "I don't have that information in the provided documents."
-    
-    # Relaxed validation for 1B model which might be chatty
-    # if len(response) < 50 and "document" not in response_lower:
-    #     if not any(keyword in response_lower for keyword in 
-    #                ["according to", "states that", "mentions", "shows"]):
-    #         return "I don't have that information in the provided documents."
-    
+    response = _clean_response(response)
+    response, lowered = _truncate_repetition(response, response.lower())
+    if _GENERIC_INDICATORS_RE.search(lowered):
+        return "I don't have that information in the provided documents."
     return response
 
 def clear_query_cache():
@@ -267,5 +746,26 @@ def clear_query_cache():
     Clear the query cache
     """
     global _query_cache
+    _load_persistent_cache()  # So the on-disk copy is cleared as well
     _query_cache.clear()
-    print("✓ Query cache cleared")
\ No newline at end of file
+    _answer_sources.clear()
+    _stale_answers.clear()
+    _semantic_cache.clear()
+    _persist("DELETE FROM qcache", ())
+    print("✓ Query cache cleared")
+
+def invalidate_query_cache():
+    """
+    Mark cached answers stale after the index changed. Each one is re-checked
+    with a retrieval pass on its next hit and kept if its sources are unchanged.
+    """
+    _load_persistent_cache()
+    _semantic_cache.clear()  # Reworded hits cannot be re-checked
+    for query_hash in list(_query_cache):
+        if query_hash in _answer_sources:
+            _stale_answers.add(query_hash)
+        else:
+            _query_cache.pop(query_hash, None)
+    _persist("DELETE FROM qcache WHERE sources IS NULL", ())
+    _persist("UPDATE qcache SET stale = 1", ())
+    print(f"✓ Query cache marked for revalidation ({len(_stale_answers)} answers)")
\ No newline at end of file
@@ -8,6 +8,8 @@ import torch
 DOCUMENTS_DIR = "documents/"
 VECTOR_DB_PATH = "vector_db/"
 VECTOR_INDEX_NAME = "rag_index"
+EMBED_CACHE_PATH = "vector_db/embed_cache.sqlite3"
+QUERY_CACHE_PATH = "vector_db/query_cache.sqlite3"
 LOCAL_EMBEDDING_PATH = "./local_embedding_models/all-MiniLM-L6-v2"
 
 # ============================================================================
@@ -15,6 +17,12 @@ LOCAL_EMBEDDING_PATH = "./local_embedding_models/all-MiniLM-L6-v2"
 # ============================================================================
 EMBEDDING_MODEL_NAME = "custom-llama3.2" # Use the same Ollama model for embeddings
 LLM_MODEL_NAME = "custom-llama3.2"  # Custom model name created in Ollama
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_HOST", "localhost:11434")  # Long-running `ollama serve` daemon
+if "://" not in OLLAMA_BASE_URL:
+    OLLAMA_BASE_URL = "http://" + OLLAMA_BASE_URL
+OLLAMA_STATUS_TTL = 30  # Seconds a successful /api/tags answer is reused
+OLLAMA_KEEP_ALIVE = 24 * 60 * 60  # Seconds Ollama keeps our models loaded after a request
+OLLAMA_KEEP_ALIVE_REFRESH = 20 * 60  # Re-load ping interval, in case the daemon evicted them anyway
 
 # ============================================================================
 # COMPUTATION
@@ -31,6 +39,7 @@ CHUNK_OVERLAP = 150
 # RETRIEVAL OPTIMIZATION
 # ============================================================================
 RETRIEVAL_K = 6  # Reduced for 1B model to avoid overwhelming it
+DEBUG_RETRIEVAL = False  # Log retrieved chunk counts and the formatted context per question
 
 # ============================================================================
 # VECTOR STORE OPTIMIZATION
@@ -38,6 +47,16 @@ RETRIEVAL_K = 6  # Reduced for 1B model to avoid overwhelming it
 USE_IVF_INDEX = False  # Exact search for accuracy
 IVF_NLIST = 100
 IVF_NPROBE = 10
+USE_PQ = False  # IVF stores 8-bit product-quantized codes instead of raw vectors (much smaller, approximate)
+PQ_MIN_NPROBE = 32  # PQ distances are coarser, so probe more clusters
+USE_HNSW_INDEX = True  # Graph-based ANN search once the corpus is large
+HNSW_MIN_VECTORS = 10000  # Below this, exact search is fast enough
+HNSW_M = 32  # Graph neighbors per node
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+USE_FP16_INDEX = False  # Store exact-search vectors as float16 (half the RAM/disk, tiny recall cost)
+MMAP_VECTOR_INDEX = True  # Map the saved index read-only instead of reading it into RAM (POSIX only)
+SAVE_RAW_VECTORS = False  # Opt-in vectors.npy next to the index (N x dim x 4 bytes more on disk), read back with load_raw_vectors() by external re-index scripts
 
 # ============================================================================
 # LLM OPTIMIZATION (Optimized for Llama 3.2 1B)
@@ -53,17 +72,33 @@ USE_QUANTIZATION = True
 # ============================================================================
 ENABLE_QUERY_CACHE = True
 CACHE_SIZE = 100
+ENABLE_EMBED_CACHE = True  # Reuse chunk embeddings across re-processing runs
+PERSIST_QUERY_CACHE = True  # Keep cached answers across restarts (SQLite)
+ENABLE_SEMANTIC_CACHE = True  # Answer reworded repeats of cached questions
+SEMANTIC_CACHE_THRESHOLD = 0.93  # Min cosine similarity between question embeddings for a hit
 
 # ============================================================================
 # BATCH PROCESSING
 # ============================================================================
-EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_BATCH_SIZE = 64  # Starting texts per embedding request (tuned at runtime, see below)
+EMBEDDING_BATCH_MIN = 8  # Failed requests are retried in halves down to this size
+EMBEDDING_BATCH_MAX = 512  # Batches grow while throughput improves, up to this size
+EMBEDDING_CONCURRENCY = 4  # Embedding requests in flight at once (overlaps HTTP with inference)
+EMBED_MEMMAP_MIN_BYTES = 256 * 1024 * 1024  # Larger embedding matrices are staged in a temp file, not RAM
 
 # ============================================================================
 # NETWORK CONFIGURATION
 # ============================================================================
 SERVER_PORT = 9999
-BUFFER_SIZE = 16384
+BUFFER_SIZE = 65536  # Per-recv read size; page-aligned and below the 128 KB malloc mmap threshold
+SOCKET_BUFFER_BYTES = 262144  # Kernel SO_RCVBUF/SO_SNDBUF for server sockets
+MAX_REQUEST_BYTES = 32 * 1024  # Larger request frames are refused unread
+MAX_QUESTION_CHARS = 2048  # Questions are truncated to this length
+SERVER_MAX_WORKERS = 2  # Concurrent RAG calls (match what the LLM can serve)
+SERVER_MAX_PENDING = 16  # Requests beyond this get an immediate "busy" reply
+BATCH_WINDOW_MS = 20  # Coalesce questions arriving within this window
+MAX_BATCH_SIZE = 8  # Max questions answered by one batched chain call
+UNIX_SOCKET_PATH = "/tmp/rag.sock"  # Local fast path for same-machine clients (POSIX only)
 
 # ============================================================================
 # OFFLINE MODE
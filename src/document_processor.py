@@ -6,6 +6,7 @@ from langchain_community.document_loaders import (
     UnstructuredFileLoader,
 )
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 def load_document(file_path):
     """
@@ -60,10 +61,16 @@ def load_documents_batch(file_paths):
     print(f"BATCH LOADING {len(file_paths)} DOCUMENTS")
     print(f"{'='*60}\n")
     
-    for i, path in enumerate(file_paths, 1):
-        print(f"[{i}/{len(file_paths)}]", end=" ")
-        docs = load_document(path)
-        all_docs.extend(docs)
+    if len(file_paths) >= 2:
+        # Parsing (PDFs especially) is CPU-bound Python; one process per core
+        # sidesteps the GIL. map() keeps the input order.
+        workers = min(len(file_paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for docs in executor.map(load_document, file_paths):
+                all_docs.extend(docs)
+    else:
+        for path in file_paths:
+            all_docs.extend(load_document(path))
     
     print(f"\n{'='*60}")
     print(f"✓ LOADED {len(all_docs)} TOTAL PAGES")
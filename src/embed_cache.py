@@ -0,0 +1,127 @@
+# src/embed_cache.py
+
+import os
+import asyncio
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.config import EMBED_CACHE_PATH
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+# Bump when the key or vector encoding changes
+_SCHEMA_VERSION = 2
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed embedding cache backed by SQLite.
+    Chunks already embedded with the same model are read back from disk,
+    so re-processing after a small document change only embeds new chunks.
+    """
+
+    def __init__(self, embeddings, model_name, db_path=EMBED_CACHE_PATH):
+        self._embeddings = embeddings
+        self._model_name = model_name.encode('utf-8')
+        self._db_path = db_path
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                # Vectors in the old encoding; it is only a cache, so start over
+                conn.execute("DROP TABLE IF EXISTS embeddings")
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Short-lived connections keep the cache usable from any worker thread
+        conn = sqlite3.connect(self._db_path)
+        try:
+            with conn:  # Commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _key(self, text):
+        return hashlib.blake2b(
+            text.encode('utf-8') + b'\0' + self._model_name,
+            digest_size=16
+        ).digest()
+
+    def _lookup(self, conn, keys):
+        found = {}
+        for start in range(0, len(keys), _SQL_BATCH):
+            batch = keys[start:start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                batch
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        return found
+
+    def _split(self, texts):
+        """Keys for texts, cached vectors by key, and {missing key: first index}"""
+        keys = [self._key(text) for text in texts]
+        with self._connect() as conn:
+            vectors = self._lookup(conn, list(set(keys)))
+
+        missing = {}
+        for i, key in enumerate(keys):
+            if key not in vectors and key not in missing:
+                missing[key] = i
+        return keys, vectors, missing
+
+    def _store(self, vectors, missing, fresh):
+        rows = []
+        for key, vec in zip(missing, fresh):
+            # float16 halves the cache on disk; the rounding error (~1e-3
+            # relative) does not change nearest-neighbour rankings in practice
+            vec = np.asarray(vec, dtype=np.float16)
+            vectors[key] = vec.astype(np.float32)
+            rows.append((key, vec.tobytes()))
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                rows
+            )
+
+    def lookup(self, texts):
+        """Cached vectors for texts, None where a text has not been embedded yet"""
+        keys, vectors, _ = self._split(texts)
+        return [vectors.get(key) for key in keys]
+
+    def embed_documents(self, texts):
+        """
+        Embed texts, sending only cache misses to the underlying model
+        """
+        keys, vectors, missing = self._split(texts)
+        if missing:
+            fresh = self._embeddings.embed_documents([texts[i] for i in missing.values()])
+            self._store(vectors, missing, fresh)
+        return [vectors[key].tolist() for key in keys]
+
+    async def aembed_documents(self, texts):
+        """
+        Async embed_documents: SQLite runs in a worker thread and the misses go
+        to the underlying model's own async client
+        """
+        keys, vectors, missing = await asyncio.to_thread(self._split, texts)
+        if missing:
+            fresh = await self._embeddings.aembed_documents([texts[i] for i in missing.values()])
+            await asyncio.to_thread(self._store, vectors, missing, fresh)
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        # Queries are one-off; no point caching them here
+        return self._embeddings.embed_query(text)
+
+    async def aembed_query(self, text):
+        return await self._embeddings.aembed_query(text)
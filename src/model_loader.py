@@ -8,39 +8,83 @@ from src.config import (
     DEVICE,
     MAX_TOKENS,
     TEMPERATURE,
-    CONTEXT_WINDOW_SIZE
+    CONTEXT_WINDOW_SIZE,
+    OLLAMA_BASE_URL,
+    OLLAMA_STATUS_TTL,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_KEEP_ALIVE_REFRESH
 )
-import subprocess
+import asyncio
+import json
 import sys
+import urllib.request
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 _llm_instance = None
 _embedding_instance = None
 
+# Models may be requested from several threads at startup; the locks make
+# sure each one is only initialized once
+_llm_lock = threading.Lock()
+_embedding_lock = threading.Lock()
+_keep_alive_lock = threading.Lock()
+
+# One persistent event loop (on a daemon thread) runs every async Ollama call:
+# chain calls, query embeddings and index builds. The clients' pooled
+# keep-alive connections belong to the loop that opened them, so a loop per
+# call (asyncio.run) would throw them away or break on reuse.
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """Shared event loop for async model calls (started on first use)"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='ollama-loop', daemon=True).start()
+            _loop = loop
+    return _loop
+
+def _ollama_request(path, payload=None, timeout=5):
+    """JSON request to the Ollama daemon's HTTP API (GET, or POST when payload is given)"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(
+        OLLAMA_BASE_URL.rstrip('/') + path,
+        data=data,
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+# Last successful /api/tags answer: (time, model names)
+_ollama_status = (0.0, None)
+
+def _ollama_models():
+    """Names of the models the daemon has, or None if it is not reachable"""
+    global _ollama_status
+    checked_at, models = _ollama_status
+    if models is not None and time.monotonic() - checked_at < OLLAMA_STATUS_TTL:
+        return models
+    try:
+        models = [m.get("name", "") for m in _ollama_request("/api/tags").get("models", [])]
+    except Exception:
+        return None  # Not cached, so a daemon that comes up is seen right away
+    _ollama_status = (time.monotonic(), models)
+    return models
+
 def is_ollama_running():
     """Check if Ollama service is running"""
-    try:
-        result = subprocess.run(
-            ["ollama", "list"], 
-            capture_output=True, 
-            timeout=5,
-            text=True
-        )
-        return result.returncode == 0
-    except:
-        return False
+    return _ollama_models() is not None
 
-def check_ollama_model(model_name):
+def check_ollama_model(model_name, models=None):
     """Check if specific model is available in Ollama"""
-    try:
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            timeout=5,
-            text=True
-        )
-        return model_name.split(':')[0] in result.stdout
-    except:
-        return False
+    if models is None:
+        models = _ollama_models() or []
+    base_name = model_name.split(':')[0]
+    return any(name.split(':')[0] == base_name for name in models)
 
 
 
@@ -48,16 +92,26 @@ def load_llm(model_name=LLM_MODEL_NAME):
     """
     Load Ollama LLM with optimized settings for Llama 3.2 1B Instruct
     """
+    if _llm_instance is not None:
+        print("✓ Using cached LLM instance.")
+        return _llm_instance
+    
+    with _llm_lock:
+        return _load_llm_locked(model_name)
+
+def _load_llm_locked(model_name):
     global _llm_instance
     
     if _llm_instance is not None:
-        print("✓ Using cached LLM instance.")
         return _llm_instance
     
     # USE OLLAMA (Local Custom Model)
     try:
-        # Check if Ollama is running
-        if not is_ollama_running():
+        # The daemon keeps the model resident across GUI/server restarts, so
+        # startup is just one readiness query instead of spawning `ollama list`
+        _status_warmed.wait(0.5)  # Usually answered by the import-time check below
+        models = _ollama_models()
+        if models is None:
             print("✗ Ollama service is not running!")
             print("  Please start Ollama first:")
             print("  Windows: Start Ollama from Start Menu")
@@ -65,7 +119,7 @@ def load_llm(model_name=LLM_MODEL_NAME):
             return None
         
         # Check if model exists
-        if not check_ollama_model(model_name):
+        if not check_ollama_model(model_name, models):
             print(f"✗ Model '{model_name}' not found in Ollama!")
             print(f"  Please run 'create_model.bat' to import your GGUF file first!")
             return None
@@ -83,10 +137,14 @@ def load_llm(model_name=LLM_MODEL_NAME):
             repeat_penalty=1.2,  # Prevent repetition
             repeat_last_n=64,  # Look back 64 tokens for repetition detection
             num_thread=8,  # Multi-threading for CPU
+            keep_alive=OLLAMA_KEEP_ALIVE,  # Stay resident between questions
         )
         
-        print("Testing Ollama connection...")
-        test_response = _llm_instance.invoke("Hi")
+        # A generate request without a prompt only loads the model (no-op if
+        # it is already warm); no tokens are generated
+        print("Warming up Ollama model...")
+        _ollama_request("/api/generate", {"model": model_name, "keep_alive": OLLAMA_KEEP_ALIVE}, timeout=120)
+        _start_keep_alive(model_name)
         
         print("✓ LLM loaded and cached successfully.")
         print(f"  Model: {model_name}")
@@ -103,16 +161,49 @@ def load_llm(model_name=LLM_MODEL_NAME):
         print("3. Check Ollama status: ollama list")
         return None
 
+# Models the keep-alive thread re-loads every OLLAMA_KEEP_ALIVE_REFRESH seconds
+_keep_alive_models = set()
+_keep_alive_thread = None
+
+def _start_keep_alive(model_name):
+    """Add a model to the background keep-alive pings (thread started on first use)"""
+    global _keep_alive_thread
+    with _keep_alive_lock:
+        _keep_alive_models.add(model_name)
+        if _keep_alive_thread is None:
+            _keep_alive_thread = threading.Thread(target=_keep_alive_loop, name='ollama-keep-alive', daemon=True)
+            _keep_alive_thread.start()
+
+def _keep_alive_loop():
+    while True:
+        time.sleep(OLLAMA_KEEP_ALIVE_REFRESH)
+        with _keep_alive_lock:
+            models = list(_keep_alive_models)
+        for model_name in models:
+            try:
+                # Prompt-less generate: loads the model (if evicted) and resets
+                # its keep-alive timer without generating anything
+                _ollama_request("/api/generate", {"model": model_name, "keep_alive": OLLAMA_KEEP_ALIVE}, timeout=120)
+            except Exception:
+                pass  # Daemon down; the next request reports it
+
 from langchain_ollama import OllamaEmbeddings
 
 def get_embedding_model():
     """
     Load Ollama embedding model (cached)
     """
+    if _embedding_instance is not None:
+        print("✓ Using cached embedding model.")
+        return _embedding_instance
+    
+    with _embedding_lock:
+        return _load_embedding_model_locked()
+
+def _load_embedding_model_locked():
     global _embedding_instance
     
     if _embedding_instance is not None:
-        print("✓ Using cached embedding model.")
         return _embedding_instance
     
     try:
@@ -120,10 +211,12 @@ def get_embedding_model():
         
         _embedding_instance = OllamaEmbeddings(
             model=EMBEDDING_MODEL_NAME,
+            keep_alive=OLLAMA_KEEP_ALIVE,
         )
         
         # Test embedding generation
         _embedding_instance.embed_query("test")
+        _start_keep_alive(EMBEDDING_MODEL_NAME)
         
         print(f"✓ Embedding model loaded successfully.")
         return _embedding_instance
@@ -143,8 +236,12 @@ def preload_models():
     print("PRELOADING MODELS FOR OPTIMAL PERFORMANCE")
     print("="*60)
     
-    llm = load_llm()
-    embeddings = get_embedding_model()
+    # Independent loads: startup takes the slower of the two, not the sum
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        llm_future = executor.submit(load_llm)
+        embeddings_future = executor.submit(get_embedding_model)
+        llm = llm_future.result()
+        embeddings = embeddings_future.result()
     
     if llm and embeddings:
         print("\n✓ All models preloaded successfully!")
@@ -162,4 +259,16 @@ def cleanup_models():
     global _llm_instance, _embedding_instance
     _llm_instance = None
     _embedding_instance = None
-    print("✓ Models cleaned up from memory")
\ No newline at end of file
+    print("✓ Models cleaned up from memory")
+
+# Query the daemon while the rest of the app is still importing, so the first
+# load_llm finds the model list already cached
+_status_warmed = threading.Event()
+
+def _warm_ollama_status():
+    try:
+        _ollama_models()
+    finally:
+        _status_warmed.set()
+
+threading.Thread(target=_warm_ollama_status, name='ollama-status', daemon=True).start()
@@ -1,25 +1,78 @@
 # src/vector_store.py
 
 import os
+import sys
+import asyncio
+import json
+import hashlib
 import pickle
+import shutil
+import tempfile
+import time
+import uuid
 import numpy as np
+import httpx
+from ollama import ResponseError
+
+# Fast C-extension compressor for the docstore pickle when available
+try:
+    import lz4.frame as _lz4
+except ImportError:
+    _lz4 = None
 
 os.environ['HF_HUB_OFFLINE'] = '1'
 os.environ['TRANSFORMERS_OFFLINE'] = '1'
 
 from langchain_community.vectorstores import FAISS
-from src.model_loader import get_embedding_model
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from src.model_loader import get_embedding_model, get_event_loop
+from src.embed_cache import CachedEmbeddings
 from src.config import (
     VECTOR_DB_PATH, 
+    EMBEDDING_MODEL_NAME,
+    ENABLE_EMBED_CACHE,
     USE_IVF_INDEX, 
     IVF_NLIST, 
     IVF_NPROBE,
-    EMBEDDING_BATCH_SIZE
+    USE_PQ,
+    PQ_MIN_NPROBE,
+    USE_HNSW_INDEX,
+    HNSW_MIN_VECTORS,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    USE_FP16_INDEX,
+    MMAP_VECTOR_INDEX,
+    SAVE_RAW_VECTORS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_MIN,
+    EMBEDDING_BATCH_MAX,
+    EMBEDDING_CONCURRENCY,
+    EMBED_MEMMAP_MIN_BYTES
 )
 
-def create_vector_store(text_chunks, index_name="document_index", progress_callback=None):
+def _load_embeddings():
+    """Embedding model used to build the store, wrapped in the on-disk cache when enabled"""
+    embeddings = get_embedding_model()
+    if embeddings and ENABLE_EMBED_CACHE:
+        # Unchanged chunks are read back from disk instead of re-embedded
+        embeddings = CachedEmbeddings(embeddings, EMBEDDING_MODEL_NAME)
+    return embeddings
+
+# Written next to the FAISS files: {file name: {"hash", "chunk_ids"}}
+MANIFEST_NAME = "index.meta.json"
+# Raw float32 embedding matrix, row i = index vector i (SAVE_RAW_VECTORS)
+VECTORS_NAME = "vectors.npy"
+
+def create_vector_store(text_chunks, index_name="document_index", progress_callback=None, ids=None,
+                        manifest=None):
     """
-    Create FAISS vector store with optional progress tracking
+    Create FAISS vector store with optional progress tracking.
+    `ids` (one per chunk) lets callers later remove chunks with update_vector_store;
+    `manifest` ({file path: [chunk ids]}) records which documents the index was built from.
     """
     if not text_chunks:
         print("⚠️ No text chunks provided.")
@@ -31,67 +84,48 @@ def create_vector_store(text_chunks, index_name="document_index", progress_callb
     print(f"Chunks to process: {len(text_chunks)}")
     
     try:
-        embeddings = get_embedding_model()
+        embeddings = _load_embeddings()
         if not embeddings:
             print("✗ Failed to load embedding model")
             return None
         
         print("\nGenerating embeddings (GPU-accelerated)...")
         
-        # Batch processing with progress tracking for large datasets
-        if progress_callback and len(text_chunks) > 100:
-            batch_size = 50
-            
-            for i in range(0, len(text_chunks), batch_size):
-                batch = text_chunks[i:i + batch_size]
-                
-                if i == 0:
-                    # Create initial vector store with first batch
-                    vector_store = FAISS.from_documents(
-                        batch, 
-                        embedding=embeddings,
-                        distance_strategy="COSINE",
-                    )
-                else:
-                    # Add subsequent batches
-                    batch_store = FAISS.from_documents(
-                        batch,
-                        embedding=embeddings,
-                        distance_strategy="COSINE",
-                    )
-                    vector_store.merge_from(batch_store)
-                
-                # Report progress
-                current = min(i + batch_size, len(text_chunks))
-                progress_callback(current, len(text_chunks))
-        else:
-            # Standard processing for small datasets
-            vector_store = FAISS.from_documents(
-                text_chunks, 
-                embedding=embeddings,
-                distance_strategy="COSINE",
-            )
-            if progress_callback:
-                progress_callback(len(text_chunks), len(text_chunks))
+        # Pull texts and metadata out of the Document objects once; batches
+        # below are plain list slices instead of per-chunk attribute access
+        texts = [chunk.page_content for chunk in text_chunks]
+        metadatas = [chunk.metadata for chunk in text_chunks]
+        
+        # One embed_documents call (one request to the embedding server) per
+        # batch, written into a single preallocated matrix; the index is built
+        # once at the end instead of merged batch by batch
+        vectors = _embed_batched(embeddings, texts, progress_callback)
+        vector_store = _store_from_vectors(embeddings, texts, vectors, metadatas, ids)
         
         # IVF optimization (only for very large datasets)
         if USE_IVF_INDEX and len(text_chunks) > 50000:
             print(f"\nOptimizing index with IVF...")
-            vector_store = _optimize_faiss_index(vector_store, IVF_NLIST, IVF_NPROBE)
+            vector_store = _optimize_faiss_index(vector_store, IVF_NLIST, IVF_NPROBE, vectors)
+        elif USE_HNSW_INDEX and len(text_chunks) > HNSW_MIN_VECTORS:
+            print(f"\nBuilding HNSW graph index...")
+            vector_store = _build_hnsw_index(vector_store, vectors)
+        elif USE_FP16_INDEX:
+            print(f"\nConverting index to float16...")
+            vector_store = _build_fp16_index(vector_store, vectors)
         else:
             print("✓ Using Exact Search (Highest Accuracy)")
         
         # Save vector store
         save_path = os.path.join(VECTOR_DB_PATH, index_name)
-        os.makedirs(VECTOR_DB_PATH, exist_ok=True)
         
         print(f"\nSaving vector store to: {save_path}")
-        vector_store.save_local(save_path)
+        _save_vector_store(vector_store, save_path, manifest, vectors if SAVE_RAW_VECTORS else None)
         
         print(f"\n{'='*60}")
         print("✓ VECTOR STORE CREATED SUCCESSFULLY")
         print(f"  Total vectors: {vector_store.index.ntotal}")
         print(f"  Dimension: {vector_store.index.d}")
+        print(f"  FAISS build: {_faiss_backend()}")
         print(f"{'='*60}\n")
         
         return vector_store
@@ -102,6 +136,371 @@ def create_vector_store(text_chunks, index_name="document_index", progress_callb
         traceback.print_exc()
         return None
 
+def _store_from_vectors(embeddings, texts, vectors, metadatas, ids=None):
+    """
+    Assemble the LangChain FAISS store directly: the embedding matrix goes to
+    index.add as-is (FAISS.from_embeddings would restack it row by row) and the
+    docstore and id map are filled in one pass
+    """
+    import faiss
+    
+    ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Duplicate ids found in the ids list.")
+    
+    # Cosine similarity as inner product of unit vectors; normalized in place
+    # by FAISS's vectorized routine, once for the whole matrix (queries are
+    # normalized by _UnitEmbeddings)
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    docstore = InMemoryDocstore({
+        doc_id: Document(id=doc_id, page_content=text, metadata=metadata)
+        for doc_id, text, metadata in zip(ids, texts, metadatas)
+    })
+    
+    return FAISS(
+        _UnitEmbeddings(embeddings),
+        index,
+        docstore,
+        dict(enumerate(ids)),
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+
+class _UnitEmbeddings(Embeddings):
+    """
+    Embedding model whose vectors come back L2-normalized, for stores over an
+    inner-product index. LangChain's normalize_L2 flag does the same but is
+    only meant for Euclidean distance and warns on every other metric.
+    """
+    
+    def __init__(self, embeddings):
+        self._embeddings = embeddings
+    
+    @staticmethod
+    def _unit(vectors):
+        vectors = np.array(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return (vectors / np.where(norms > 0, norms, 1)).tolist()
+    
+    def embed_documents(self, texts):
+        return self._unit(self._embeddings.embed_documents(texts))
+    
+    def embed_query(self, text):
+        return self._unit(self._embeddings.embed_query(text))
+    
+    async def aembed_documents(self, texts):
+        return self._unit(await self._embeddings.aembed_documents(texts))
+    
+    async def aembed_query(self, text):
+        return self._unit(await self._embeddings.aembed_query(text))
+
+def _embed_batched(embeddings, texts, progress_callback=None):
+    """
+    Embed texts in batched requests into one float32 matrix, reporting
+    progress after each batch
+    """
+    # Identical chunks (repeated headers, footers, boilerplate) are embedded
+    # once; every duplicate still gets its own row, docstore entry and metadata
+    unique = {}
+    inverse = [unique.setdefault(text, len(unique)) for text in texts]
+    
+    vectors = _embed_unique(embeddings, list(unique), progress_callback)
+    
+    if len(unique) == len(texts):
+        return vectors
+    print(f"  Skipped {len(texts) - len(unique)} duplicate chunk(s)")
+    return np.take(vectors, inverse, axis=0, out=_allocate_matrix(len(texts), vectors.shape[1]))
+
+def _embed_unique(embeddings, texts, progress_callback=None):
+    """
+    Embedding matrix for distinct texts. Cache hits are read up front, so
+    only texts that reach the model go through the adaptive batcher and its
+    timings are not skewed by batches served from disk.
+    """
+    if not isinstance(embeddings, CachedEmbeddings):
+        return _run_batched(embeddings, texts, progress_callback)
+    
+    cached = embeddings.lookup(texts)
+    misses = [i for i, vec in enumerate(cached) if vec is None]
+    hits = len(texts) - len(misses)
+    print(f"  Embedding cache: {hits}/{len(texts)} hits")
+    if not hits:
+        return _run_batched(embeddings, texts, progress_callback)
+    
+    vectors = _allocate_matrix(len(texts), len(next(vec for vec in cached if vec is not None)))
+    for i, vec in enumerate(cached):
+        if vec is not None:
+            vectors[i] = vec
+    if misses:
+        report = None
+        if progress_callback:
+            report = lambda done, total: progress_callback(hits + done, len(texts))
+        vectors[misses] = _run_batched(embeddings, [texts[i] for i in misses], report)
+    elif progress_callback:
+        progress_callback(len(texts), len(texts))
+    return vectors
+
+def _run_batched(embeddings, texts, progress_callback=None):
+    # On the shared loop, so batches reuse the async client's pooled connections
+    return asyncio.run_coroutine_threadsafe(
+        _embed_batched_async(embeddings, texts, progress_callback), get_event_loop()
+    ).result()
+
+class _AdaptiveBatcher:
+    """
+    Embedding batch size tuned at runtime. Starts at EMBEDDING_BATCH_SIZE and
+    doubles while bigger batches keep cutting the time per text by 10%+, then
+    settles on the best size seen. A request that times out or hits a server
+    error (typically out of memory) halves the size and is retried as two
+    halves; anything else, such as the server being down, is raised at once.
+    """
+    
+    def __init__(self, size=EMBEDDING_BATCH_SIZE, min_size=EMBEDDING_BATCH_MIN, max_size=EMBEDDING_BATCH_MAX):
+        self.size = size
+        self._min = min_size
+        self._max = max_size
+        self._best = None  # (seconds per text, batch size)
+        self._growing = True
+    
+    async def embed(self, embeddings, texts):
+        start = time.perf_counter()
+        try:
+            vectors = await embeddings.aembed_documents(texts)
+        except Exception as e:
+            if len(texts) <= self._min or not _is_overload(e):
+                raise
+            self.size = max(len(texts) // 2, self._min)
+            self._growing = False
+            print(f"⚠️ Embedding batch of {len(texts)} failed ({e}); retrying as batches of {self.size}")
+            mid = len(texts) // 2
+            return (await self.embed(embeddings, texts[:mid])) + (await self.embed(embeddings, texts[mid:]))
+        self._record(len(texts), time.perf_counter() - start)
+        return vectors
+    
+    def _record(self, count, seconds):
+        if count != self.size:
+            return  # Tail batch or retried half; not a measurement of this size
+        per_text = seconds / count
+        if self._best is None or per_text < 0.9 * self._best[0]:
+            self._best = (per_text, count)
+            if self._growing and count < self._max:
+                self.size = min(count * 2, self._max)
+        elif self._growing:
+            # No longer getting faster per text: go back to the best size
+            self._growing = False
+            self.size = self._best[1]
+
+def _is_overload(error):
+    """True for embedding failures a smaller batch can fix (timeouts, 5xx)"""
+    if isinstance(error, (ConnectionError, httpx.ConnectError, httpx.ConnectTimeout)):
+        return False
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, httpx.TimeoutException)):
+        return True
+    return isinstance(error, ResponseError) and error.status_code >= 500
+
+def _allocate_matrix(rows, dim):
+    """
+    Embedding matrix; past EMBED_MEMMAP_MIN_BYTES it is backed by an anonymous
+    temp file, so the OS pages it out instead of it sitting in RAM next to the
+    index's own copy of the vectors
+    """
+    if rows * dim * 4 < EMBED_MEMMAP_MIN_BYTES:
+        return np.empty((rows, dim), dtype=np.float32)
+    os.makedirs(VECTOR_DB_PATH, exist_ok=True)
+    # Deleted as soon as the mapping is released; closing the file keeps the map
+    with tempfile.TemporaryFile(dir=VECTOR_DB_PATH) as f:
+        return np.memmap(f, dtype=np.float32, mode='w+', shape=(rows, dim))
+
+async def _embed_batched_async(embeddings, texts, progress_callback=None):
+    # EMBEDDING_CONCURRENCY workers each take the next slice at the current
+    # batch size, so the server is never idle while Python handles a response
+    batcher = _AdaptiveBatcher()
+    vectors = None
+    done = 0
+    next_start = 0
+    
+    async def worker():
+        nonlocal vectors, done, next_start
+        while next_start < len(texts):
+            start = next_start
+            next_start = min(start + batcher.size, len(texts))
+            batch = await batcher.embed(embeddings, texts[start:next_start])
+            batch = np.asarray(batch, dtype=np.float32)
+            if vectors is None:
+                vectors = _allocate_matrix(len(texts), batch.shape[1])
+            # Written by position, so completion order does not matter
+            vectors[start:start + len(batch)] = batch
+            done += len(batch)
+            if progress_callback:
+                progress_callback(done, len(texts))
+    
+    tasks = [asyncio.ensure_future(worker()) for _ in range(EMBEDDING_CONCURRENCY)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # A failed batch fails the build: stop the other workers instead of
+        # leaving them sending requests on the loop that also serves chat
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return vectors
+
+def _faiss_backend():
+    """
+    SIMD level of the loaded FAISS build. faiss-cpu selects its AVX2/AVX-512
+    module (or dispatches at runtime) on import; a bare scalar build here
+    means search runs several times slower than it could.
+    """
+    try:
+        import faiss
+        return faiss.get_compile_options().strip() or "generic"
+    except Exception:
+        return "unknown"
+
+def _write_docstore(vector_store, tmp_dir, save_path):
+    """
+    Pickle the docstore and id map like FAISS.save_local does, but with the
+    highest protocol and, when lz4 is installed, compressed (index.pkl.lz4)
+    """
+    data = pickle.dumps(
+        (vector_store.docstore, vector_store.index_to_docstore_id),
+        protocol=pickle.HIGHEST_PROTOCOL
+    )
+    if _lz4 is not None:
+        with open(os.path.join(tmp_dir, "index.pkl.lz4"), 'wb') as f:
+            f.write(_lz4.compress(data))
+        stale = "index.pkl"
+    else:
+        with open(os.path.join(tmp_dir, "index.pkl"), 'wb') as f:
+            f.write(data)
+        stale = "index.pkl.lz4"
+    # Only one docstore file may sit next to the index
+    _remove_if_exists(os.path.join(save_path, stale))
+
+def _read_docstore(db_path):
+    """(docstore, index_to_docstore_id) saved by _write_docstore or FAISS.save_local"""
+    compressed_path = os.path.join(db_path, "index.pkl.lz4")
+    if os.path.exists(compressed_path):
+        if _lz4 is None:
+            raise RuntimeError("index.pkl.lz4 needs the lz4 package (pip install lz4)")
+        with open(compressed_path, 'rb') as f:
+            return pickle.loads(_lz4.decompress(f.read()))
+    with open(os.path.join(db_path, "index.pkl"), 'rb') as f:
+        return pickle.load(f)
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _index_vectors(index, vectors=None):
+    """
+    Raw vectors to build a new index from: the embedding matrix when the
+    caller has it, else copied back out of the flat index
+    """
+    if vectors is not None:
+        return vectors
+    return index.reconstruct_n(0, index.ntotal)
+
+def load_raw_vectors(index_name="document_index"):
+    """
+    The saved index's float32 vectors (memory-mapped) for re-indexing
+    (IVF/PQ/HNSW) without re-embedding; None unless the store was built with
+    SAVE_RAW_VECTORS and has not been incrementally updated since
+    """
+    try:
+        return np.load(os.path.join(VECTOR_DB_PATH, index_name, VECTORS_NAME), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+def _hash_file(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _save_vector_store(vector_store, save_path, manifest=None, vectors=None):
+    """
+    Save to a scratch directory and rename the files into place, so a process
+    that has the old index memory-mapped keeps reading the old inode instead of
+    seeing it truncated underneath it. `vectors` (the index's raw float32
+    matrix) is written as vectors.npy.
+    """
+    os.makedirs(save_path, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(save_path)))
+    try:
+        import faiss
+        faiss.write_index(vector_store.index, os.path.join(tmp_dir, "index.faiss"))
+        _write_docstore(vector_store, tmp_dir, save_path)
+        if manifest is not None:
+            entries = {
+                os.path.basename(path): {"hash": _hash_file(path), "chunk_ids": list(chunk_ids)}
+                for path, chunk_ids in manifest.items()
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+        else:
+            # An index saved without a manifest must not inherit a stale one
+            _remove_if_exists(os.path.join(save_path, MANIFEST_NAME))
+        if vectors is not None:
+            np.save(os.path.join(tmp_dir, VECTORS_NAME), vectors)
+        else:
+            # Same for raw vectors that no longer match the index
+            _remove_if_exists(os.path.join(save_path, VECTORS_NAME))
+        for name in os.listdir(tmp_dir):
+            os.replace(os.path.join(tmp_dir, name), os.path.join(save_path, name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def update_vector_store(vector_store, new_chunks, new_ids, removed_ids, index_name="document_index",
+                        manifest=None):
+    """
+    Apply a document delta to an existing FAISS store instead of rebuilding it:
+    removed chunk ids go through index.remove_ids, new chunks are embedded and added
+    """
+    print(f"\nUpdating vector store: +{len(new_chunks)} / -{len(removed_ids)} chunks")
+    
+    if removed_ids and "HNSW" in type(vector_store.index).__name__:
+        print("ℹ️ HNSW indexes cannot remove vectors; rebuilding instead")
+        return None
+    
+    try:
+        import faiss
+        
+        if removed_ids:
+            # Drops the vectors (remove_ids) and their docstore entries
+            vector_store.delete(list(removed_ids))
+        
+        if new_chunks:
+            embeddings = _load_embeddings()
+            if not embeddings:
+                print("✗ Failed to load embedding model")
+                return None
+            texts = [chunk.page_content for chunk in new_chunks]
+            vectors = _embed_batched(embeddings, texts)
+            if vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                faiss.normalize_L2(vectors)
+            vector_store.add_embeddings(
+                zip(texts, vectors),
+                metadatas=[chunk.metadata for chunk in new_chunks],
+                ids=list(new_ids)
+            )
+        
+        _save_vector_store(vector_store, os.path.join(VECTOR_DB_PATH, index_name), manifest)
+        
+        print(f"✓ Vector store updated ({vector_store.index.ntotal} vectors)")
+        return vector_store
+        
+    except Exception as e:
+        print(f"\n✗ Error updating vector store: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
 def load_vector_store(index_name="document_index"):
     """
     Load existing FAISS vector store
@@ -120,13 +519,38 @@ def load_vector_store(index_name="document_index"):
             print("✗ Failed to load embedding model")
             return None
         
-        vector_store = FAISS.load_local(
-            db_path, 
-            embeddings, 
-            allow_dangerous_deserialization=True
-        )
+        import faiss
+        index_path = os.path.join(db_path, "index.faiss")
+        io_flags = 0
+        if MMAP_VECTOR_INDEX and sys.platform != 'win32':
+            # Vectors are paged in on demand and shared with other processes
+            # mapping the same file (read-only: rebuilds go through create_vector_store)
+            io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        
+        try:
+            index = faiss.read_index(index_path, io_flags)
+        except RuntimeError:
+            if not io_flags:
+                raise
+            # Index types without mmap support are read into memory instead
+            io_flags = 0
+            index = faiss.read_index(index_path)
+        
+        _apply_search_params(index)
+        
+        docstore, index_to_docstore_id = _read_docstore(db_path)
+        
+        if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            # Built by _store_from_vectors over unit vectors (indexes saved
+            # before that keep their L2 setup)
+            vector_store = FAISS(
+                _UnitEmbeddings(embeddings), index, docstore, index_to_docstore_id,
+                distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+            )
+        else:
+            vector_store = FAISS(embeddings, index, docstore, index_to_docstore_id)
         
-        print(f"✓ Vector store loaded successfully")
+        print(f"✓ Vector store loaded successfully" + (" (memory-mapped)" if io_flags else ""))
         print(f"  Total vectors: {vector_store.index.ntotal}")
         
         return vector_store
@@ -135,7 +559,91 @@ def load_vector_store(index_name="document_index"):
         print(f"✗ Error loading vector store: {e}")
         return None
 
-def _optimize_faiss_index(vector_store, nlist, nprobe):
+def _apply_search_params(index):
+    """
+    Search-time knobs are saved with the index; re-apply the configured values
+    so tuning IVF_NPROBE / HNSW_EF_SEARCH takes effect without a rebuild
+    """
+    if hasattr(index, 'nprobe'):
+        index.nprobe = _ivf_nprobe(index, IVF_NPROBE)
+    hnsw = getattr(index, 'hnsw', None)
+    if hnsw is not None:
+        hnsw.efSearch = HNSW_EF_SEARCH
+
+def read_index_manifest(index_name, paths):
+    """
+    Return {path: [chunk ids]} if the saved index was built from exactly these
+    files with their current content, else None
+    """
+    manifest_path = os.path.join(VECTOR_DB_PATH, index_name, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    by_name = {os.path.basename(path): path for path in paths}
+    if set(by_name) != set(entries):
+        return None
+    
+    try:
+        for name, path in by_name.items():
+            if _hash_file(path) != entries[name]["hash"]:
+                return None
+    except OSError:
+        return None
+    
+    return {path: entries[name]["chunk_ids"] for name, path in by_name.items()}
+
+def _build_hnsw_index(vector_store, vectors=None):
+    """
+    Replace the flat index with an HNSW graph: queries visit O(log N) vectors
+    instead of scanning all of them, at a small recall cost.
+    HNSW cannot remove vectors, so document deletions rebuild the store.
+    """
+    try:
+        import faiss
+        original_index = vector_store.index
+        
+        index_hnsw = faiss.IndexHNSWFlat(original_index.d, HNSW_M, original_index.metric_type)
+        index_hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index_hnsw.add(_index_vectors(original_index, vectors))
+        index_hnsw.hnsw.efSearch = HNSW_EF_SEARCH
+        
+        vector_store.index = index_hnsw
+        
+        print(f"✓ HNSW index built: {original_index.ntotal} vectors (M={HNSW_M})")
+        return vector_store
+        
+    except Exception as e:
+        print(f"⚠️ Could not build HNSW index: {e}")
+        return vector_store
+
+def _build_fp16_index(vector_store, vectors=None):
+    """
+    Replace the flat index with a float16 scalar-quantized one: still an exact
+    scan over every vector, but half the memory and bandwidth per query.
+    Supports remove_ids, so incremental updates keep working.
+    """
+    try:
+        import faiss
+        original_index = vector_store.index
+        
+        index_fp16 = faiss.IndexScalarQuantizer(
+            original_index.d, faiss.ScalarQuantizer.QT_fp16, original_index.metric_type
+        )
+        index_fp16.add(_index_vectors(original_index, vectors))
+        
+        vector_store.index = index_fp16
+        
+        print(f"✓ float16 index built: {original_index.ntotal} vectors")
+        return vector_store
+        
+    except Exception as e:
+        print(f"⚠️ Could not build float16 index: {e}")
+        return vector_store
+
+def _optimize_faiss_index(vector_store, nlist, nprobe, vectors=None):
     """
     Optimize FAISS index with IVF (for very large datasets)
     """
@@ -146,13 +654,25 @@ def _optimize_faiss_index(vector_store, nlist, nprobe):
         
         # Create IVF index
         quantizer = faiss.IndexFlatIP(d)
-        index_ivf = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+        if USE_PQ:
+            # 8-bit codes for m sub-vectors: d/m * 4 times smaller than float32,
+            # and distances come from small lookup tables that stay in cache
+            m = _pq_subquantizers(d)
+            index_ivf = faiss.IndexIVFPQ(quantizer, d, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index_ivf = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
         
-        # Train and add vectors
-        vectors = original_index.reconstruct_n(0, original_index.ntotal)
-        index_ivf.train(vectors)
+        # Train on a uniform sample (k-means needs ~256 points per centroid;
+        # the rest add cost but barely move the centroids), then add everything
+        vectors = _index_vectors(original_index, vectors)
+        n_train = min(len(vectors), 256 * nlist)
+        if n_train < len(vectors):
+            sample = np.random.default_rng(0).choice(len(vectors), n_train, replace=False)
+            index_ivf.train(vectors[sample])
+        else:
+            index_ivf.train(vectors)
         index_ivf.add(vectors)
-        index_ivf.nprobe = nprobe
+        index_ivf.nprobe = _ivf_nprobe(index_ivf, nprobe)
         
         vector_store.index = index_ivf
         
@@ -161,4 +681,15 @@ def _optimize_faiss_index(vector_store, nlist, nprobe):
         
     except Exception as e:
         print(f"⚠️ Could not optimize index: {e}")
-        return vector_store
\ No newline at end of file
+        return vector_store
+
+def _pq_subquantizers(d):
+    """Largest divisor of d that is at most d // 4 (PQ needs d % m == 0)"""
+    for m in range(max(d // 4, 1), 0, -1):
+        if d % m == 0:
+            return m
+
+def _ivf_nprobe(index, nprobe):
+    if "PQ" in type(index).__name__:
+        return max(nprobe, PQ_MIN_NPROBE)
+    return nprobe